@@ -3,51 +3,30 @@
 # Copyright (C) 2018 Axel Tillequin (bdcht3@gmail.com)
 # published under GPLv2 license
 
+from array import array
+from collections import OrderedDict
 from crysp.bits import *
 from crysp.poly import Poly
 from crysp.utils.operators import concat
+from crysp.gf256 import Exp,Log,gmul
+from crysp import gf256
 
-Exp = [\
-0x01, 0x03, 0x05, 0x0f, 0x11, 0x33, 0x55, 0xff, 0x1a, 0x2e, 0x72, 0x96, 0xa1, 0xf8, 0x13, 0x35,
-0x5f, 0xe1, 0x38, 0x48, 0xd8, 0x73, 0x95, 0xa4, 0xf7, 0x02, 0x06, 0x0a, 0x1e, 0x22, 0x66, 0xaa,
-0xe5, 0x34, 0x5c, 0xe4, 0x37, 0x59, 0xeb, 0x26, 0x6a, 0xbe, 0xd9, 0x70, 0x90, 0xab, 0xe6, 0x31,
-0x53, 0xf5, 0x04, 0x0c, 0x14, 0x3c, 0x44, 0xcc, 0x4f, 0xd1, 0x68, 0xb8, 0xd3, 0x6e, 0xb2, 0xcd,
-0x4c, 0xd4, 0x67, 0xa9, 0xe0, 0x3b, 0x4d, 0xd7, 0x62, 0xa6, 0xf1, 0x08, 0x18, 0x28, 0x78, 0x88,
-0x83, 0x9e, 0xb9, 0xd0, 0x6b, 0xbd, 0xdc, 0x7f, 0x81, 0x98, 0xb3, 0xce, 0x49, 0xdb, 0x76, 0x9a,
-0xb5, 0xc4, 0x57, 0xf9, 0x10, 0x30, 0x50, 0xf0, 0x0b, 0x1d, 0x27, 0x69, 0xbb, 0xd6, 0x61, 0xa3,
-0xfe, 0x19, 0x2b, 0x7d, 0x87, 0x92, 0xad, 0xec, 0x2f, 0x71, 0x93, 0xae, 0xe9, 0x20, 0x60, 0xa0,
-0xfb, 0x16, 0x3a, 0x4e, 0xd2, 0x6d, 0xb7, 0xc2, 0x5d, 0xe7, 0x32, 0x56, 0xfa, 0x15, 0x3f, 0x41,
-0xc3, 0x5e, 0xe2, 0x3d, 0x47, 0xc9, 0x40, 0xc0, 0x5b, 0xed, 0x2c, 0x74, 0x9c, 0xbf, 0xda, 0x75,
-0x9f, 0xba, 0xd5, 0x64, 0xac, 0xef, 0x2a, 0x7e, 0x82, 0x9d, 0xbc, 0xdf, 0x7a, 0x8e, 0x89, 0x80,
-0x9b, 0xb6, 0xc1, 0x58, 0xe8, 0x23, 0x65, 0xaf, 0xea, 0x25, 0x6f, 0xb1, 0xc8, 0x43, 0xc5, 0x54,
-0xfc, 0x1f, 0x21, 0x63, 0xa5, 0xf4, 0x07, 0x09, 0x1b, 0x2d, 0x77, 0x99, 0xb0, 0xcb, 0x46, 0xca,
-0x45, 0xcf, 0x4a, 0xde, 0x79, 0x8b, 0x86, 0x91, 0xa8, 0xe3, 0x3e, 0x42, 0xc6, 0x51, 0xf3, 0x0e,
-0x12, 0x36, 0x5a, 0xee, 0x29, 0x7b, 0x8d, 0x8c, 0x8f, 0x8a, 0x85, 0x94, 0xa7, 0xf2, 0x0d, 0x17,
-0x39, 0x4b, 0xdd, 0x7c, 0x84, 0x97, 0xa2, 0xfd, 0x1c, 0x24, 0x6c, 0xb4, 0xc7, 0x52, 0xf6]
-
-Log = [\
-None, 0x00, 0x19, 0x01, 0x32, 0x02, 0x1a, 0xc6, 0x4b, 0xc7, 0x1b, 0x68, 0x33, 0xee, 0xdf, 0x03,
-0x64, 0x04, 0xe0, 0x0e, 0x34, 0x8d, 0x81, 0xef, 0x4c, 0x71, 0x08, 0xc8, 0xf8, 0x69, 0x1c, 0xc1,
-0x7d, 0xc2, 0x1d, 0xb5, 0xf9, 0xb9, 0x27, 0x6a, 0x4d, 0xe4, 0xa6, 0x72, 0x9a, 0xc9, 0x09, 0x78,
-0x65, 0x2f, 0x8a, 0x05, 0x21, 0x0f, 0xe1, 0x24, 0x12, 0xf0, 0x82, 0x45, 0x35, 0x93, 0xda, 0x8e,
-0x96, 0x8f, 0xdb, 0xbd, 0x36, 0xd0, 0xce, 0x94, 0x13, 0x5c, 0xd2, 0xf1, 0x40, 0x46, 0x83, 0x38,
-0x66, 0xdd, 0xfd, 0x30, 0xbf, 0x06, 0x8b, 0x62, 0xb3, 0x25, 0xe2, 0x98, 0x22, 0x88, 0x91, 0x10,
-0x7e, 0x6e, 0x48, 0xc3, 0xa3, 0xb6, 0x1e, 0x42, 0x3a, 0x6b, 0x28, 0x54, 0xfa, 0x85, 0x3d, 0xba,
-0x2b, 0x79, 0x0a, 0x15, 0x9b, 0x9f, 0x5e, 0xca, 0x4e, 0xd4, 0xac, 0xe5, 0xf3, 0x73, 0xa7, 0x57,
-0xaf, 0x58, 0xa8, 0x50, 0xf4, 0xea, 0xd6, 0x74, 0x4f, 0xae, 0xe9, 0xd5, 0xe7, 0xe6, 0xad, 0xe8,
-0x2c, 0xd7, 0x75, 0x7a, 0xeb, 0x16, 0x0b, 0xf5, 0x59, 0xcb, 0x5f, 0xb0, 0x9c, 0xa9, 0x51, 0xa0,
-0x7f, 0x0c, 0xf6, 0x6f, 0x17, 0xc4, 0x49, 0xec, 0xd8, 0x43, 0x1f, 0x2d, 0xa4, 0x76, 0x7b, 0xb7,
-0xcc, 0xbb, 0x3e, 0x5a, 0xfb, 0x60, 0xb1, 0x86, 0x3b, 0x52, 0xa1, 0x6c, 0xaa, 0x55, 0x29, 0x9d,
-0x97, 0xb2, 0x87, 0x90, 0x61, 0xbe, 0xdc, 0xfc, 0xbc, 0x95, 0xcf, 0xcd, 0x37, 0x3f, 0x5b, 0xd1,
-0x53, 0x39, 0x84, 0x3c, 0x41, 0xa2, 0x6d, 0x47, 0x14, 0x2a, 0x9e, 0x5d, 0x56, 0xf2, 0xd3, 0xab,
-0x44, 0x11, 0x92, 0xd9, 0x23, 0x20, 0x2e, 0x89, 0xb4, 0x7c, 0xb8, 0x26, 0x77, 0x99, 0xe3, 0xa5,
-0x67, 0x4a, 0xed, 0xde, 0xc5, 0x31, 0xfe, 0x18, 0x0d, 0x63, 0x8c, 0x80, 0xc0, 0xf7, 0x70, 0x07]
-
-def gmul(a,n):
-    if a>0:
-        return Exp[ (Log[a]+Log[n])%0xff ]
-    else:
-        return 0
+# bounded LRU cache of key schedules, shared by AES instances with same key:
+KEYCACHE_SIZE = 64
+_keycache = OrderedDict()
+
+def _schedules(key):
+    """returns the (mutable) list [w, inverse w, fastkeys] associated to
+       key bytes, where each schedule is filled on first use.
+    """
+    try:
+        s = _keycache.pop(key)
+    except KeyError:
+        s = [None,None,None]
+        while len(_keycache)>=KEYCACHE_SIZE:
+            _keycache.popitem(last=False)
+    _keycache[key] = s
+    return s
 
 class AES(object):
     size = 128
@@ -96,10 +75,30 @@ class AES(object):
         self.Nk = K.size//32
         self.Nr = {4:10,6:12,8:14}[self.Nk]
         self.K = K
-        self.__w = None
+        self.__sched = _schedules(pack(K))
+
+    def keyschedule(self,inverse=False):
+        """returns the round keys words, or the equivalent inverse cipher
+           round keys words (reversed, with InvMixColumns applied to inner
+           rounds) if inverse is True. Both are computed once per key and
+           shared by all instances with the same key (see KEYCACHE_SIZE).
+        """
+        # the shared entry may have been filled by another instance:
+        w = self.__sched[0]
+        if w is None:
+            w = self.__sched[0] = self._keyexpansion()
+        if not inverse: return w
+        if self.__sched[1] is None:
+            Nr = self.Nr
+            dw = w[4*Nr:4*Nr+4]
+            for r in range(Nr-1,0,-1):
+                dw.extend([Poly(_invmix(int.from_bytes(bytes(x.ival),'big')).to_bytes(4,'big'))
+                           for x in w[4*r:4*r+4]])
+            dw.extend(w[0:4])
+            self.__sched[1] = dw
+        return self.__sched[1]
 
-    def keyschedule(self):
-        if self.__w is not None: return self.__w
+    def _keyexpansion(self):
         def rotw(x):
             a0,a1,a2,a3 = x.ival
             return (a1,a2,a3,a0)
@@ -113,8 +112,7 @@ class AES(object):
                 tmp = self.sboxtable[tmp.ival]
             w.append(w[i-self.Nk]^tmp)
             i += 1
-        self.__w = w
-        return self.__w
+        return w
 
     def enc(self,M):
         Nb=self.Nb
@@ -146,6 +144,50 @@ class AES(object):
         self.AddRoundKey(state,w[0:Nb])
         return pack(state)
 
+    # T-tables engine:
+    def fastkeys(self):
+        """returns the round keys and the equivalent inverse cipher round keys
+           as 32-bit ints (big-endian columns) for fast_enc and fast_dec.
+        """
+        if self.__sched[2] is None:
+            self.__sched[2] = tuple([[int.from_bytes(bytes(x.ival),'big') for x in w]
+                                     for w in (self.keyschedule(),self.keyschedule(True))])
+        return self.__sched[2]
+
+    def fast_enc(self,M):
+        "same as enc with T-tables over 32-bit columns."
+        return struct.pack('>4L',*_tenc(self.fastkeys()[0],self.Nr,*struct.unpack('>4L',M)))
+
+    def fast_dec(self,C):
+        "same as dec with T-tables over 32-bit columns (equivalent inverse cipher)."
+        return struct.pack('>4L',*_tdec(self.fastkeys()[1],self.Nr,*struct.unpack('>4L',C)))
+
+    # multi-blocks API:
+    def enc_blocks(self,buf,out=None):
+        """encrypt all blocks of buf (bytes, bytearray or memoryview of length
+           multiple of 16) in one call with the T-tables engine. Results are
+           written into the preallocated bytearray out (allocated if None),
+           which can be buf itself. Returns out.
+        """
+        return self._blocks(_tenc,self.fastkeys()[0],buf,out)
+
+    def dec_blocks(self,buf,out=None):
+        "decrypt all blocks of buf into out (see enc_blocks)."
+        return self._blocks(_tdec,self.fastkeys()[1],buf,out)
+
+    def _blocks(self,f,k,buf,out):
+        if isinstance(buf,memoryview): buf = buf.cast('B')
+        if len(buf)%16: raise ValueError("buffer length must be a multiple of 16")
+        if out is None: out = bytearray(len(buf))
+        Nr = self.Nr
+        pack_into = struct.pack_into
+        off = 0
+        for s in struct.iter_unpack('>4L',buf):
+            pack_into('>4L',out,off,*f(k,Nr,*s))
+            off += 16
+        return out
+
+    # step-by-step round functions:
     def SubBytes(self,state):
         state[:] = Sbox(state)
 
@@ -165,30 +207,92 @@ class AES(object):
                          12,9,6,3]
 
     def MixColumns(self,state):
-        W = state[0:4],state[4:8],state[8:12],state[12:16]
-        i = 0
-        for w in W:
-            a,b,c,d = w.ival
-            state.ival[i+0] = gmul(a,2)^gmul(b,3)^c^d
-            state.ival[i+1] = a^gmul(b,2)^gmul(c,3)^d
-            state.ival[i+2] = a^b^gmul(c,2)^gmul(d,3)
-            state.ival[i+3] = gmul(a,3)^b^c^gmul(d,2)
-            i += 4
+        # each column (a,b,c,d) is a 32-bit lane of the state as 128-bit int,
+        # so that rotating all lanes by 8 bits gives (b,c,d,a) for all columns:
+        s = bytes(state.ival)
+        v = _int(gf256.mul(s,2))^_rotr(_int(gf256.mul(s,3)),8)
+        v ^= _rotr(_int(s),16)^_rotr(_int(s),24)
+        state.ival[:] = _vec(v)
 
     def InvMixColumns(self,state):
-        W = state[0:4],state[4:8],state[8:12],state[12:16]
-        i = 0
-        for w in W:
-            a,b,c,d = w.ival
-            state.ival[i+0] = gmul(a,0xe)^gmul(b,0xb)^gmul(c,0xd)^gmul(d,0x9)
-            state.ival[i+1] = gmul(a,0x9)^gmul(b,0xe)^gmul(c,0xb)^gmul(d,0xd)
-            state.ival[i+2] = gmul(a,0xd)^gmul(b,0x9)^gmul(c,0xe)^gmul(d,0xb)
-            state.ival[i+3] = gmul(a,0xb)^gmul(b,0xd)^gmul(c,0x9)^gmul(d,0xe)
-            i += 4
+        s = bytes(state.ival)
+        v = _int(gf256.mul(s,14))^_rotr(_int(gf256.mul(s,11)),8)
+        v ^= _rotr(_int(gf256.mul(s,13)),16)^_rotr(_int(gf256.mul(s,9)),24)
+        state.ival[:] = _vec(v)
 
     def AddRoundKey(self,state,w):
         state[:] = state^concat(w)
 
+# MixColumns helpers:
+def _int(s):
+    return int.from_bytes(s,'little')
+
+def _vec(v):
+    return array('B',v.to_bytes(16,'little'))
+
+_lanes = dict([(k,int.from_bytes((0xffffffff>>k).to_bytes(4,'little')*4,'little'))
+               for k in (8,16,24)])
+
+def _rotr(v,k):
+    "rotate right all 32-bit lanes of v by k bits (byte i gets byte i+k/8)."
+    m = _lanes[k]
+    return ((v>>k)&m)|((v<<(32-k))&~m&((1<<128)-1))
+
+# T-tables: Te0[x] is the MixColumns column of (S[x],0,0,0) as big-endian word,
+# Td0[x] the InvMixColumns column of (Si[x],0,0,0). Te1..Te3 and Td1..Td3 are
+# the same words rotated right by 8, 16 and 24 bits.
+_S  = bytes(AES.sboxtable.ival)
+_Si = bytes(AES.sboxinvtable.ival)
+
+def _ttables(S,a,b,c,d):
+    T0 = tuple([(a[x]<<24)|(b[x]<<16)|(c[x]<<8)|d[x] for x in S])
+    T = [T0]
+    for r in (8,16,24):
+        T.append(tuple([((x>>r)|(x<<(32-r)))&0xffffffff for x in T0]))
+    return T
+
+Te0,Te1,Te2,Te3 = _ttables(_S,gf256.M2,gf256.table(1),gf256.table(1),gf256.M3)
+Td0,Td1,Td2,Td3 = _ttables(_Si,gf256.M14,gf256.M9,gf256.M13,gf256.M11)
+
+def _tenc(ek,Nr,s0,s1,s2,s3):
+    "T-tables encryption of the 4 columns words with round keys ek."
+    s0 ^= ek[0]; s1 ^= ek[1]; s2 ^= ek[2]; s3 ^= ek[3]
+    for k in range(4,4*Nr,4):
+        t0 = Te0[s0>>24]^Te1[(s1>>16)&0xff]^Te2[(s2>>8)&0xff]^Te3[s3&0xff]^ek[k]
+        t1 = Te0[s1>>24]^Te1[(s2>>16)&0xff]^Te2[(s3>>8)&0xff]^Te3[s0&0xff]^ek[k+1]
+        t2 = Te0[s2>>24]^Te1[(s3>>16)&0xff]^Te2[(s0>>8)&0xff]^Te3[s1&0xff]^ek[k+2]
+        t3 = Te0[s3>>24]^Te1[(s0>>16)&0xff]^Te2[(s1>>8)&0xff]^Te3[s2&0xff]^ek[k+3]
+        s0,s1,s2,s3 = t0,t1,t2,t3
+    k = 4*Nr
+    S = _S
+    t0 = (S[s0>>24]<<24|S[(s1>>16)&0xff]<<16|S[(s2>>8)&0xff]<<8|S[s3&0xff])^ek[k]
+    t1 = (S[s1>>24]<<24|S[(s2>>16)&0xff]<<16|S[(s3>>8)&0xff]<<8|S[s0&0xff])^ek[k+1]
+    t2 = (S[s2>>24]<<24|S[(s3>>16)&0xff]<<16|S[(s0>>8)&0xff]<<8|S[s1&0xff])^ek[k+2]
+    t3 = (S[s3>>24]<<24|S[(s0>>16)&0xff]<<16|S[(s1>>8)&0xff]<<8|S[s2&0xff])^ek[k+3]
+    return (t0,t1,t2,t3)
+
+def _tdec(dk,Nr,s0,s1,s2,s3):
+    "T-tables decryption of the 4 columns words with inverse cipher round keys dk."
+    s0 ^= dk[0]; s1 ^= dk[1]; s2 ^= dk[2]; s3 ^= dk[3]
+    for k in range(4,4*Nr,4):
+        t0 = Td0[s0>>24]^Td1[(s3>>16)&0xff]^Td2[(s2>>8)&0xff]^Td3[s1&0xff]^dk[k]
+        t1 = Td0[s1>>24]^Td1[(s0>>16)&0xff]^Td2[(s3>>8)&0xff]^Td3[s2&0xff]^dk[k+1]
+        t2 = Td0[s2>>24]^Td1[(s1>>16)&0xff]^Td2[(s0>>8)&0xff]^Td3[s3&0xff]^dk[k+2]
+        t3 = Td0[s3>>24]^Td1[(s2>>16)&0xff]^Td2[(s1>>8)&0xff]^Td3[s0&0xff]^dk[k+3]
+        s0,s1,s2,s3 = t0,t1,t2,t3
+    k = 4*Nr
+    S = _Si
+    t0 = (S[s0>>24]<<24|S[(s3>>16)&0xff]<<16|S[(s2>>8)&0xff]<<8|S[s1&0xff])^dk[k]
+    t1 = (S[s1>>24]<<24|S[(s0>>16)&0xff]<<16|S[(s3>>8)&0xff]<<8|S[s2&0xff])^dk[k+1]
+    t2 = (S[s2>>24]<<24|S[(s1>>16)&0xff]<<16|S[(s0>>8)&0xff]<<8|S[s3&0xff])^dk[k+2]
+    t3 = (S[s3>>24]<<24|S[(s2>>16)&0xff]<<16|S[(s1>>8)&0xff]<<8|S[s0&0xff])^dk[k+3]
+    return (t0,t1,t2,t3)
+
+def _invmix(x):
+    "InvMixColumns of a big-endian column word."
+    S = _S
+    return Td0[S[x>>24]]^Td1[S[(x>>16)&0xff]]^Td2[S[(x>>8)&0xff]]^Td3[S[x&0xff]]
+
 def Sbox(state):
     return AES.sboxtable[state.ival]
 
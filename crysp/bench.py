@@ -0,0 +1,519 @@
+# -*- coding: utf-8 -*-
+
+# This code is part of crysp
+# Copyright (C) 2026 Axel Tillequin (bdcht3@gmail.com)
+# published under GPLv2 license
+
+# micro-benchmarks of crysp internals.
+# Each bench_xxx function returns a dict of timings (in seconds per call)
+# and can be run from the command line with:
+#   python -m crysp.bench [--json] [xxx ...]
+
+import timeit
+import random
+
+from crysp.bits import *
+
+def _timeit(f,number):
+    "returns the best time per call of f over 3 repeats of number calls."
+    return min(timeit.repeat(f,number=number,repeat=3))/number
+
+#------------------------------------------------------------------------------
+def bench_hw(sizes=(8,64,256,4096),number=1000):
+    """compare Bits.hw and hw_many with the legacy bitlist().count(1)
+       hamming weight computation.
+    """
+    res = {}
+    for n in sizes:
+        x = Bits(random.getrandbits(n),n)
+        L = [Bits(random.getrandbits(n),n) for _ in range(64)]
+        res[n] = {
+          'bitlist': _timeit(lambda: x.bitlist().count(1),number),
+          'hw'     : _timeit(x.hw,number),
+          'hw_many': _timeit(lambda: hw_many(L),number)/len(L),
+        }
+    return res
+
+#------------------------------------------------------------------------------
+def bench_bitsarray(sizes=(32,64),n=1024,number=20):
+    """compare word-wise xor/add/rol over n words held in a list of Bits
+       or in a BitsArray.
+    """
+    from crysp.utils.operators import rol
+    res = {}
+    for w in sizes:
+        L = [Bits(random.getrandbits(w),w) for _ in range(n)]
+        A = BitsArray(L,w)
+        res[w] = {
+          'Bits'     : _timeit(lambda: [rol(x^y,7)+y for x,y in zip(L,L)],number),
+          'BitsArray': _timeit(lambda: (A^A).rol(7)+A,number),
+        }
+    return res
+
+#------------------------------------------------------------------------------
+def _allocated(f):
+    "returns the count of memory blocks allocated by f and still alive."
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        s0 = tracemalloc.take_snapshot()
+        r = f()
+        s1 = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del r
+    return sum(x.count_diff for x in s1.compare_to(s0,'filename'))
+
+def bench_const(n=4096):
+    """compare memory blocks held by n 4-bit and 8-bit S-box outputs created
+       with Bits(v,size) or interned with Bits.const(v,size).
+    """
+    res = {}
+    for w in (4,8):
+        V = [random.getrandbits(w) for _ in range(n)]
+        res[w] = {
+          'Bits' : _allocated(lambda: [Bits(v,w) for v in V]),
+          'const': _allocated(lambda: [Bits.const(v,w) for v in V]),
+        }
+    return res
+
+#------------------------------------------------------------------------------
+def bench_permutation(number=2000):
+    """compare Bits list gathers with compiled BitPermutation plans for DES
+       and Serpent permutation tables.
+    """
+    from crysp import des,serpent
+    res = {}
+    for name,p in (('des.IP',des.IP_table),('des.E',des.E_table),
+                   ('serpent._IP',serpent._IP_table)):
+        x = Bits(random.getrandbits(p.size),p.size)
+        t = list(p.table)
+        res[name] = {
+          'list'          : _timeit(lambda: x[t],number),
+          'BitPermutation': _timeit(lambda: x[p],number),
+        }
+    return res
+
+#------------------------------------------------------------------------------
+def _created(f):
+    "returns the count of Bits objects initialized during f() call."
+    count = [0]
+    init = Bits.__init__
+    def counting_init(self,*args,**kargs):
+        count[0] += 1
+        init(self,*args,**kargs)
+    Bits.__init__ = counting_init
+    try:
+        f()
+    finally:
+        Bits.__init__ = init
+    return count[0]
+
+def bench_allocs():
+    """count Bits objects created by one compression function/block
+       encryption call of hashes and ciphers.
+    """
+    from crysp.sha import SHA1,SHA2
+    from crysp.md import MD5
+    from crysp.keccak import keccak_256
+    from crysp.threefish import Threefish
+    from crysp.serpent import Serpent
+    from crysp.des import DES
+    T = Threefish(b'k'*64,b't'*16)
+    S = Serpent(b'k'*32)
+    D = DES(b'k'*8)
+    res = {}
+    for name,f in (('SHA1',lambda: SHA1()(b'abc')),
+                   ('SHA256',lambda: SHA2(256)(b'abc')),
+                   ('MD5',lambda: MD5()(b'abc')),
+                   ('Keccak256',lambda: keccak_256(b'abc')),
+                   ('Threefish512',lambda: T.enc(b'm'*64)),
+                   ('Serpent',lambda: S.enc(b'm'*16)),
+                   ('DES',lambda: D.enc(b'm'*8))):
+        res[name] = {'Bits': _created(f)}
+    return res
+
+#------------------------------------------------------------------------------
+def bench_concat(sizes=(1<<14,1<<16,1<<20),maxfloordiv=1<<16):
+    """compare assembling sizes bytes from 64-bit lanes with repeated //
+       (up to maxfloordiv bytes only, since it is quadratic), with concat
+       and with a BitsBuilder.
+    """
+    from crysp.utils.operators import concat
+    res = {}
+    for n in sizes:
+        L = [Bits(random.getrandbits(64),64) for _ in range(n//8)]
+        def floordiv():
+            Z = Bits(0,0)
+            for x in L: Z = Z//x
+            return Z
+        def builder():
+            Z = BitsBuilder()
+            for x in L: Z //= x
+            return Z.bits()
+        res[n] = {
+          'concat'     : _timeit(lambda: concat(L),1),
+          'BitsBuilder': _timeit(builder,1),
+        }
+        if n<=maxfloordiv:
+            res[n]['//'] = _timeit(floordiv,1)
+    return res
+
+#------------------------------------------------------------------------------
+def bench_render(sizes=(64,128,1600),number=10**6):
+    """throughput (renders per second) of str, hex and todots over number
+       renders of a Bits of given size, and of from_str/from_hex parsing.
+    """
+    res = {}
+    for n in sizes:
+        x = Bits(random.getrandbits(n),n)
+        s,h = str(x),x.hex()
+        res[n] = {
+          'str'     : 1./_timeit(x.__str__,number),
+          'hex'     : 1./_timeit(x.hex,number),
+          'todots'  : 1./_timeit(x.todots,number),
+          'from_str': 1./_timeit(lambda: Bits.from_str(s),number),
+          'from_hex': 1./_timeit(lambda: Bits.from_hex(h,n),number),
+        }
+    return res
+
+#------------------------------------------------------------------------------
+def bench_bitslice(sizes=(64,1024)):
+    """compare time per block of the Serpent and DES per-block enc with
+       their bitsliced versions over batches of n blocks.
+    """
+    import os
+    from crysp.serpent import Serpent
+    from crysp.des import DES
+    from crysp.bitslice import BitslicedSerpent,BitslicedDES
+    res = {}
+    for name,C,BC,k,l in (('Serpent',Serpent,BitslicedSerpent,32,16),
+                          ('DES',DES,BitslicedDES,8,8)):
+        K = os.urandom(k)
+        E,BE = C(K),BC(K)
+        M = os.urandom(l)
+        res[name] = {'enc': _timeit(lambda: E.enc(M),10)}
+        for n in sizes:
+            M = os.urandom(l*n)
+            res[name]['bitsliced[%d]'%n] = _timeit(lambda: BE.enc(M),1)/n
+    return res
+
+#------------------------------------------------------------------------------
+def bench_poly(sizes=(16,64,256),number=5):
+    """compare schoolbook and Karatsuba multiplication of Poly over Z/2**32
+       with n coefficients, and GF(2)[x] multiplication modulo a degree-128
+       polynomial by long division or by GF2Modulus Barrett reduction.
+    """
+    import crysp.poly
+    from crysp.poly import Poly,clmul,cldivmod,GF2Modulus
+    res = {}
+    for n in sizes:
+        x = Poly([random.getrandbits(32) for _ in range(n)],32)
+        a = list(x.ival)
+        res[n] = {
+          'schoolbook': _timeit(lambda: crysp.poly._schoolbook(a,a),number),
+          'karatsuba' : _timeit(lambda: x*x,number),
+        }
+    M = GF2Modulus((1<<128)|0x87)
+    a,b = random.getrandbits(128),random.getrandbits(128)
+    res['gf2^128'] = {
+      'cldivmod'  : _timeit(lambda: cldivmod(clmul(a,b),M.m),1000),
+      'GF2Modulus': _timeit(lambda: M.mul(a,b),1000),
+    }
+    M = GF2Modulus((1<<32)|0x04c11db7)
+    a = random.getrandbits(8*4096)
+    res['crc32 4KiB'] = {
+      'cldivmod'  : _timeit(lambda: cldivmod(a<<32,M.m),number),
+      'GF2Modulus': _timeit(lambda: M.reduce(a<<32),number),
+    }
+    return res
+
+#------------------------------------------------------------------------------
+def bench_gf256(n=1<<16,number=3):
+    """compare the product of n bytes by a constant with gmul or with a
+       gf256.mul table, and AES MixColumns/InvMixColumns.
+    """
+    import os
+    from crysp import gf256
+    from crysp.aes import AES
+    from crysp.poly import Poly
+    b = os.urandom(n)
+    A = AES(b'k'*16)
+    S = Poly(os.urandom(16))
+    return {
+      'mul(%d bytes)'%n: {
+        'gmul': _timeit(lambda: bytes([gf256.gmul(x,3) if x else 0 for x in b]),number),
+        'gf256.mul': _timeit(lambda: gf256.mul(b,3),number),
+      },
+      'AES': {
+        'MixColumns'   : _timeit(lambda: A.MixColumns(S),1000),
+        'InvMixColumns': _timeit(lambda: A.InvMixColumns(S),1000),
+        'enc'          : _timeit(lambda: A.enc(b[:16]),100),
+      },
+    }
+
+#------------------------------------------------------------------------------
+def bench_aes(nblocks=1024):
+    """throughput in MB/s of AES enc/dec, T-tables fast_enc/fast_dec and
+       enc_blocks/dec_blocks for 128, 192 and 256-bit keys (nblocks blocks
+       for the fast paths), and
+       key setup time with or without the key schedules cache.
+    """
+    import os
+    from crysp.aes import AES
+    res = {}
+    for n in (16,24,32):
+        A = AES(os.urandom(n))
+        M = [os.urandom(16) for _ in range(nblocks)]
+        B = b''.join(M)
+        out = bytearray(len(B))
+        mb = 16*nblocks/1e6
+        res['AES-%d'%(8*n)] = {
+          'enc'     : 16e-6/_timeit(lambda: A.enc(M[0]),20),
+          'dec'     : 16e-6/_timeit(lambda: A.dec(M[0]),20),
+          'fast_enc': mb/_timeit(lambda: [A.fast_enc(m) for m in M],1),
+          'fast_dec': mb/_timeit(lambda: [A.fast_dec(m) for m in M],1),
+          'enc_blocks': mb/_timeit(lambda: A.enc_blocks(B,out),1),
+          'dec_blocks': mb/_timeit(lambda: A.dec_blocks(B,out),1),
+        }
+    # key setup time (in seconds) of AES(k).fast_dec without/with key cache:
+    import crysp.aes
+    k = os.urandom(16)
+    def setup(clear):
+        if clear: crysp.aes._keycache.clear()
+        return AES(k).fast_dec(M[0])
+    res['keysetup'] = {
+      'first' : _timeit(lambda: setup(True),10),
+      'cached': _timeit(lambda: setup(False),10),
+    }
+    return res
+
+#------------------------------------------------------------------------------
+def bench_des(nbytes=1<<14):
+    """time per block of DES enc with precomputed subkeys vs. with subkeys
+       derived for each block (as DES(k).enc(m) does) and of the SP-box
+       fast_enc, TDEA key setup for 1, 2 and 3 distinct keys, and 3DES-CBC
+       encryption throughput (MB/s) over nbytes of data with enc or
+       fast_enc (use nbytes=1<<20 for 1 MiB).
+    """
+    import os
+    from crysp.des import DES,TDEA
+    from crysp.mode import CBC
+    k = os.urandom(24)
+    m = os.urandom(8)
+    D = DES(k[:8])
+    T = TDEA(k)
+    class F(object):
+        blocksize = 64
+        enc = T.fast_enc
+        dec = T.fast_dec
+    M = os.urandom(nbytes)
+    return {
+      'DES': {
+        'enc'      : _timeit(lambda: D.enc(m),20),
+        'enc_rekey': _timeit(lambda: DES(k[:8]).enc(m),20),
+        'fast_enc' : _timeit(lambda: D.fast_enc(m),1000),
+      },
+      'TDEA setup': {
+        '1-key': _timeit(lambda: TDEA(k[:8]),100),
+        '2-key': _timeit(lambda: TDEA(k[:16]),100),
+        '3-key': _timeit(lambda: TDEA(k),100),
+      },
+      '3DES-CBC': {
+        'enc'     : nbytes/1e6/_timeit(lambda: CBC(T,IV=m).enc(M),1),
+        'fast_enc': nbytes/1e6/_timeit(lambda: CBC(F,IV=m).enc(M),1),
+      },
+    }
+
+#------------------------------------------------------------------------------
+def bench_xor(sizes=(16,64,1024,1<<16),number=200):
+    """compare the legacy per-byte xorstr with crysp.utils.xor xor and
+       xor_into over buffers of given sizes.
+    """
+    import os
+    from crysp.utils.xor import xor,xor_into
+    res = {}
+    for n in sizes:
+        a,b = os.urandom(n),os.urandom(n)
+        d = bytearray(n)
+        res[n] = {
+          'zip'     : _timeit(lambda: bytes([x^y for (x,y) in zip(a,b)]),number),
+          'xor'     : _timeit(lambda: xor(a,b),number),
+          'xor_into': _timeit(lambda: xor_into(d,a,b),number),
+        }
+    return res
+
+#------------------------------------------------------------------------------
+class _NullCipher(object):
+    "identity 128-bit block cipher, to measure modes of operation overhead."
+    size = 128
+    blocksize = 128
+    def enc(self,M): return M
+    def dec(self,C): return C
+
+def bench_modes(sizes=(1<<10,1<<14,1<<18,1<<22)):
+    """throughput in MB/s of CBC and CTS_CBC decryption with a null cipher
+       for all message sizes (up to 64 MiB with sizes=(1<<10,...,1<<26)),
+       which should stay constant now that both are linear-time.
+    """
+    import os
+    from crysp.mode import CBC,CTS_CBC
+    N = _NullCipher()
+    IV = bytes(16)
+    res = {}
+    for n in sizes:
+        C = CBC(N,IV).enc(os.urandom(n))
+        D = os.urandom(n+5)
+        number = max(1,(1<<16)//n)
+        res[n] = {
+          'CBC.dec'    : n/1e6/_timeit(lambda: CBC(N,IV).dec(C),number),
+          'CTS_CBC.dec': n/1e6/_timeit(lambda: CTS_CBC(N,IV).dec(D),number),
+        }
+    return res
+
+#------------------------------------------------------------------------------
+def bench_ctr(workers=(1,2,4,8),nblocks=256):
+    """throughput in MB/s of CTR encryption of nblocks blocks with AES and
+       Serpent, using 1 (serial) or more worker processes (including the
+       process pool startup).
+    """
+    import os
+    from crysp.aes import AES
+    from crysp.serpent import Serpent
+    from crysp.mode import CTR
+    res = {}
+    for name,C in (('AES',AES(os.urandom(16))),('Serpent',Serpent(os.urandom(32)))):
+        M = os.urandom(16*nblocks)
+        iv = os.urandom(16)
+        res[name] = dict([(w,len(M)/1e6/_timeit(lambda: CTR(C,iv).enc(M,workers=w),1))
+                          for w in workers])
+    return res
+
+#------------------------------------------------------------------------------
+def bench_pool(nblocks=256,chunksize=32,workers=4):
+    """throughput in MB/s of AES ECB encryption and CBC decryption of nblocks
+       blocks, serial or with chunks of blocks dispatched to a thread or
+       process pool of the given number of workers.
+    """
+    import os
+    from concurrent.futures import ThreadPoolExecutor,ProcessPoolExecutor
+    from crysp.aes import AES
+    from crysp.mode import ECB,CBC
+    A = AES(os.urandom(16))
+    iv = os.urandom(16)
+    M = os.urandom(16*nblocks)
+    C = CBC(A,iv).enc(M)
+    mb = len(M)/1e6
+    res = {}
+    for name,ex in (('serial',None),
+                    ('threads',ThreadPoolExecutor(workers)),
+                    ('processes',ProcessPoolExecutor(workers))):
+        res[name] = {
+          'ECB.enc': mb/_timeit(lambda: ECB(A).enc(M,ex,chunksize),1),
+          'CBC.dec': mb/_timeit(lambda: CBC(A,iv).dec(C,ex,chunksize),1),
+        }
+        if ex is not None: ex.shutdown()
+    return res
+
+#------------------------------------------------------------------------------
+def _ciphers():
+    """returns the list of (name, keylen, blocklen, setup, enc) of all ciphers,
+       where setup(key bytes) returns a cipher object and enc(obj,block)
+       encrypts one block (or 64 bytes for stream ciphers).
+    """
+    from crysp.aes import AES
+    from crysp.serpent import Serpent
+    from crysp.des import DES,TDEA
+    from crysp.threefish import Threefish
+    from crysp.rc4 import RC4
+    from crysp.salsa20 import Salsa20
+    from crysp.chacha import Chacha
+    from crysp.wb import table_rKT,table_M1,table_M2,table_M3,WhiteDES
+    def whitedes(k):
+        bK = Bits(k,64)
+        KT = [table_rKT(r,bK)[1] for r in range(16)]
+        return WhiteDES(KT,table_M1(),table_M2()[0],table_M3())
+    def aes(k,fast=False):
+        # AES expands its key lazily, force the schedule into the setup:
+        A = AES(k)
+        A.keyschedule()
+        if fast: A.fastkeys()
+        return A
+    iv = Bits(0,64)
+    L = []
+    for n in (16,24,32):
+        L.append(('AES-%d'%(8*n),n,16,aes,lambda c,m: c.enc(m)))
+        L.append(('AES-%d/fast'%(8*n),n,16,lambda k: aes(k,True),
+                  lambda c,m: c.fast_enc(m)))
+    for n in (32,64,128):
+        L.append(('Threefish-%d'%(8*n),n,n,lambda k: Threefish(k,b't'*16),
+                  lambda c,m: c.enc(m)))
+    L.extend([
+      ('Serpent'  ,32,16,Serpent ,lambda c,m: c.enc(m)),
+      ('DES'      , 8, 8,DES     ,lambda c,m: c.enc(m)),
+      ('TDEA'     ,24, 8,lambda k: TDEA(k[:8],k[8:16],k[16:]),
+                   lambda c,m: c.enc(m)),
+      ('WhiteDES' , 8, 8,whitedes,lambda c,m: c.enc(m)),
+      ('RC4'      ,16,64,RC4     ,lambda c,m: c.enc(m)),
+      ('Salsa20'  ,32,64,lambda k: Salsa20(Bits(k,bitorder=1)),
+                   lambda c,m: c.enc(iv,m)),
+      ('Chacha'   ,32,64,lambda k: Chacha(Bits(k,bitorder=1)),
+                   lambda c,m: c.enc(iv,m)),
+    ])
+    return L
+
+def bench_keyagility(nkeys=5,nblocks=10,names=None):
+    """key-agility of all ciphers (or those in names): best key setup time
+       and first block latency over nkeys distinct keys, and steady-state
+       time per block (seconds).
+    """
+    import os
+    from time import perf_counter
+    res = {}
+    for name,klen,blen,setup,enc in _ciphers():
+        if names and name not in names: continue
+        M = os.urandom(blen)
+        tsetup,tfirst = [],[]
+        for _ in range(nkeys):
+            k = os.urandom(klen)
+            t0 = perf_counter()
+            C = setup(k)
+            t1 = perf_counter()
+            enc(C,M)
+            t2 = perf_counter()
+            tsetup.append(t1-t0)
+            tfirst.append(t2-t1)
+        res[name] = {
+          'setup': min(tsetup),
+          'first': min(tfirst),
+          'block': _timeit(lambda: enc(C,M),nblocks),
+        }
+    return res
+
+#------------------------------------------------------------------------------
+def _fmt(k,v):
+    return '%s=%.3g'%(k,v) if isinstance(v,float) else '%s=%s'%(k,v)
+
+def main(argv=None):
+    """run given benchmarks (or all of them), and print results as text or
+       as a JSON object {bench_name: results} if --json is given.
+    """
+    import sys
+    names = (argv if argv is not None else sys.argv[1:])
+    asjson = '--json' in names
+    names = [n for n in names if n!='--json']
+    if not names:
+        names = [k[6:] for k in sorted(globals()) if k.startswith('bench_')]
+    allres = {}
+    for name in names:
+        res = allres['bench_%s'%name] = globals()['bench_%s'%name]()
+        if asjson: continue
+        print('bench_%s:'%name)
+        for k,v in res.items():
+            print('  %s: %s'%(k,', '.join(_fmt(*t) for t in v.items())))
+    if asjson:
+        import json
+        print(json.dumps(allres,indent=2))
+
+if __name__=='__main__':
+    main()
@@ -3,19 +3,35 @@
 # published under GPLv2 license
 
 import struct
-import codecs
+import operator
+import sys
+from array import array
+from io import BytesIO
 
-__all__ = ['struct','Bits','reverse_byte','pack','unpack']
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['struct','Bits','reverse_byte','pack','unpack',
+           'popcount','hw_many','hd_many','BitsArray','BitPermutation',
+           'BitReader','BitWriter','BitsBuilder']
 
 def reverse_byte(b):
     "reverse all bits in a byte-size int"
     return (b * 0x0202020202 & 0x010884422010) % 1023
 
+# bytes.translate table for reversing all bits of every byte:
+revtab = bytes([reverse_byte(b) for b in range(256)])
+
 def pack(obj,fmt='<L'):
     """write obj in little-endian format by default (<L).
        use '>L' for big-endian format.
     """
     assert fmt in ['<L','>L']
+    if isinstance(obj,Bits):
+        n = (obj.size+7)>>3
+        return obj.int().to_bytes(n,'big' if fmt=='>L' else 'little')
     s = [x.ival&0xff for x in obj.split(8)]
     if fmt=='>L': s.reverse()
     return bytes(s)
@@ -40,10 +56,52 @@ def unpack(istr,bigend=False):
         if r==0: return (b,size)
     raise ValueError
 
-hextab_r = ('0000','1000','0100','1100',
-            '0010','1010','0110','1110',
-            '0001','1001','0101','1101',
-            '0011','1011','0111','1111')
+# popcount engine: int.bit_count is available from python 3.10,
+# older interpreters fallback to counting 1s in the binary string.
+if hasattr(int,'bit_count'):
+    def popcount(v):
+        "returns the count of 1s in the binary expansion of integer v."
+        return v.bit_count()
+else:
+    def popcount(v):
+        "returns the count of 1s in the binary expansion of integer v."
+        return bin(v).count('1')
+
+def hw_many(L):
+    """returns the list of hamming weights of all elements of sequence L.
+       Elements can be Bits objects or python ints.
+    """
+    return [popcount(x.ival&x.mask) if isinstance(x,Bits) else popcount(x)
+            for x in L]
+
+def hd_many(A,B):
+    """returns the list of hamming distances between elements of sequences A
+       and B (Bits objects or python ints). If B is a single Bits or int,
+       distances from every element of A to B are returned.
+    """
+    if isinstance(B,(Bits,int)):
+        B = [B]*len(A)
+    if len(A)!=len(B):
+        raise ValueError
+    res = []
+    for a,b in zip(A,B):
+        if isinstance(a,Bits):
+            if isinstance(b,Bits):
+                if a.size!=b.size: raise ValueError
+                b = b.ival
+            res.append(popcount((a.ival^b)&a.mask))
+        elif isinstance(b,Bits):
+            res.append(popcount((a^b.ival)&b.mask))
+        else:
+            res.append(popcount(a^b))
+    return res
+
+# interned Bits constants (see Bits.const):
+_consts = {}
+
+# str.translate tables for Bits.todots and Bits.from_str:
+_dots = str.maketrans('01',' .')
+_undots = str.maketrans(' .','01')
 
 class Bits(object):
     """The Bits class represents an ordered sequence of bits.
@@ -68,6 +126,11 @@ class Bits(object):
        - raw little-endian "packed" bytes: the struct.pack extension
          to encode the sequence as a little-endian arbitrary long integer is
          provided by function :func:`pack`.
+
+       In-place operators (&=, |=, ^=, +=, -=) and methods rol_/ror_ modify
+       the object itself rather than rebinding the name to a new object, so
+       all references to this object see the change: use Bits(obj) to get
+       a copy when the object is shared.
     """
 
     __slots__ = ['ival','__sz','mask']
@@ -78,8 +141,9 @@ class Bits(object):
 
         - int values: bits are ordered from LSB to MSB.
         - list (of 0 and 1s): bits are ordered as listed.
-        - bytes: The bit ordering of the given sequence of bytes is chosen
-                 by the bitorder parameter. See method :meth:`load`.
+        - bytes (or bytearray, memoryview): The bit ordering of the given
+                 sequence of bytes is chosen by the bitorder parameter.
+                 See method :meth:`load`.
         """
         self.ival = self.__sz = self.mask = 0
         if v is not None:
@@ -96,18 +160,33 @@ class Bits(object):
                 self.ival = 0
                 for x in reversed(v):
                     self.ival = (self.ival<<1)|(x&1)
-            elif isinstance(v,bytes):
+            elif isinstance(v,(bytes,bytearray,memoryview)):
                 self.load(v,bitorder)
             else:
                 raise TypeError(v)
             #adjust size (and mask):
             if size!=None: self.size = size
 
+    @classmethod
+    def const(cls,v,size):
+        """returns a shared Bits(v,size) object for int v and small sizes
+           (up to 8 bits), or a new object otherwise.
+           Interned objects are read-only: in-place operators return a new
+           Bits object and other modifications raise an exception.
+        """
+        if size<=8 and 0<=v<(1<<size):
+            try:
+                return _consts[size][v]
+            except KeyError:
+                t = _consts[size] = tuple([_ConstBits(x,size) for x in range(1<<size)])
+                return t[v]
+        return cls(v,size)
+
     def load(self,v,bitorder=-1):
         """load a sequence of bytes according to some bitorder convention. 
 
            Parameters:
-              - v (bytes): input sequence. The sequence is decoded as a list
+              - v (bytes-like): input sequence. The sequence is decoded as a list
                            of big-endian integers of size given by the magnitude
                            of bitorder. The sequence length must be a multiple of
                            bitorder.
@@ -140,28 +219,27 @@ class Bits(object):
                 Bits(b'\x0b\x0a\x0d\x0c'[::-1],bitorder=2) (PDP-endian).
                 Bits(b'\x0c\x0d\x0a\x0b',bitorder=2) (Honeywell316).
         """
-        bytestr = bytes(v)
-        l = len(bytestr)
+        if isinstance(v,memoryview):
+            v = v.cast('B')
+        elif not isinstance(v,(bytes,bytearray)):
+            v = bytes(v)
+        l = len(v)
         self.size = l*8
-        if bitorder<0:
-            f = reverse_byte
-            bitorder = -bitorder
-        elif bitorder>0:
-            f = lambda x:x
-        else:
-            f = lambda x:x
-            bitorder = l
-        if l%bitorder != 0:
+        n = abs(bitorder) or l
+        if l==0:
+            self.ival = 0
+            return
+        if l%n != 0:
             raise ValueError("v length must be a multiple of bitorder.")
-        v = 0
-        elsz = bitorder*8
-        for i in reversed(range(0,l,bitorder)):
-            e = bytestr[i:i+bitorder]
-            x = 0
-            for b in e:
-                x = (x<<8) | f(b)
-            v = (v<<elsz) | x
-        self.ival = v
+        if bitorder<0:
+            v = bytes(v).translate(revtab)
+        if n==l:
+            self.ival = int.from_bytes(v,'big')
+            return
+        if n>1:
+            v = bytes(v)
+            v = b''.join([v[i:i+n][::-1] for i in range(0,l,n)])
+        self.ival = int.from_bytes(v,'little')
 
     def __len__(self):
         "length in number of bits"
@@ -210,21 +288,20 @@ class Bits(object):
 
     def __str__(self):
         "get the *bitstream* represention as an unicode str of 0s and 1s."
-        xval = ("%x"%(self.ival&self.mask)).zfill(self.__sz//4+1)
-        s = [hextab_r[int(x,16)] for x in xval]
-        s.reverse()
-        return u''.join(s)[:self.__sz]
+        return bin(self.ival&self.mask)[:1:-1].ljust(self.__sz,'0')[:self.__sz]
+
+    @classmethod
+    def from_str(cls,s):
+        """returns the Bits object represented by the bitstream string s of
+           0s and 1s (inverse of str(obj)). The todots format is also allowed.
+        """
+        s = s.strip('|').translate(_undots)
+        return cls(int(s[::-1] or '0',2),len(s))
 
     def __bytes__(self):
         "get the *bitstream* representation as a bytes str."
-        v = self.ival&self.mask
-        i = 0
-        s = []
-        while i<self.__sz:
-          s.append(reverse_byte(v&0xff))
-          v = v>>8
-          i += 8
-        return bytes(s)
+        n = (self.__sz+7)>>3
+        return (self.ival&self.mask).to_bytes(n,'little').translate(revtab)
 
     def bytes(self):
         "get the *bitstream* representation as a bytes str."
@@ -232,11 +309,21 @@ class Bits(object):
 
     def hex(self):
         "get the *bitstream* representation as an hex string."
-        return codecs.encode(self.__bytes__(),'hex')
+        return self.__bytes__().hex().encode()
+
+    @classmethod
+    def from_hex(cls,h,size=None):
+        """returns the Bits object of given size (defaults to 4 bits per hex
+           digit) represented by the bitstream hex string h (inverse of
+           obj.hex()).
+        """
+        if isinstance(h,(bytes,bytearray)): h = h.decode()
+        b = bytes.fromhex(h)
+        return cls(b,size if size is not None else len(b)*8)
 
     def todots(self):
         "get the *bitstream* representation as a 1-dot 0-blank string."
-        return u'|%s|'%str(self).replace('0',' ').replace('1','.')
+        return u'|%s|'%str(self).translate(_dots)
 
     def split(self,subsize,bigend=False):
         """returns a list of Bits objects of size subsize, ordered from
@@ -277,9 +364,12 @@ class Bits(object):
     def __getitem__(self,i):
         """getitem operator defines b[i], b[i:j] and b[list] which returns the requested
            bit values as a Bits object of selected bits. If parameter i is a list, each
-           value in the list extract one bit at index value.
+           value in the list extract one bit at index value. If parameter i is a
+           :class:`BitPermutation`, its precompiled plan is applied.
         """
-        if isinstance(i,int):
+        if isinstance(i,BitPermutation):
+            return Bits(i.apply(self.ival),i.outsize)
+        elif isinstance(i,int):
             return Bits(self.bit(i),1)
         elif isinstance(i,slice):
             start,stop,step = i.indices(self.__sz)
@@ -432,6 +522,60 @@ class Bits(object):
     def __rsub__(self,lvalue):
         return Bits(lvalue,self.size)-self
 
+#   in-place operators update ival (and extend size if needed) without
+#   creating a new object:
+    def _rvalue(self,rvalue):
+        # returns ival,size of rvalue as obtained from Bits(rvalue):
+        if isinstance(rvalue,Bits):
+            return rvalue.ival,rvalue.size
+        if isinstance(rvalue,int):
+            v = abs(rvalue)
+            return v,v.bit_length()
+        obj = Bits(rvalue)
+        return obj.ival,obj.size
+
+    def __iand__(self,rvalue):
+        v,size = self._rvalue(rvalue)
+        if size>self.__sz: self.size = size
+        self.ival &= v
+        return self
+
+    def __ior__(self,rvalue):
+        v,size = self._rvalue(rvalue)
+        if size>self.__sz: self.size = size
+        self.ival |= v
+        return self
+
+    def __ixor__(self,rvalue):
+        v,size = self._rvalue(rvalue)
+        if size>self.__sz: self.size = size
+        self.ival ^= v
+        return self
+
+    def __iadd__(self,rvalue):
+        v,size = self._rvalue(rvalue)
+        if size>self.__sz: self.size = size
+        self.ival = (self.ival+v)&self.mask
+        return self
+
+    def __isub__(self,rvalue):
+        v,size = self._rvalue(rvalue)
+        if size>self.__sz: self.size = size
+        self.ival = (self.ival-v)&self.mask
+        return self
+
+    def rol_(self,n):
+        "rotate left by n bits in place (returns self)."
+        sz = self.__sz
+        n = n%sz
+        v = self.ival&self.mask
+        self.ival = ((v<<n)|(v>>(sz-n)))&self.mask
+        return self
+
+    def ror_(self,n):
+        "rotate right by n bits in place (returns self)."
+        return self.rol_(self.__sz-(n%self.__sz))
+
 #   operator // is used for concatenation:
     def __floordiv__(self,rvalue):
         if not isinstance(rvalue,Bits):
@@ -451,7 +595,7 @@ class Bits(object):
 
     def hw(self):
         "returns the hamming weight of the object (count of 1s)."
-        return self.bitlist().count(1)
+        return popcount(self.ival&self.mask)
 
     def hd(self,other):
         "returns the hamming distance to other object of same length."
@@ -461,5 +605,533 @@ class Bits(object):
             obj = other
         if self.size != obj.size:
             raise ValueError
-        return (self^obj).hw()
+        return popcount((self.ival^obj.ival)&self.mask)
+
+class _ConstBits(Bits):
+    """read-only Bits interned by Bits.const: in-place operators work on a
+       copy (x = Bits.const(v,n); x ^= y rebinds x to a new Bits) and any
+       other modification raises an exception.
+    """
+    __slots__ = ()
+
+    def __init__(self,v,size):
+        b = Bits(v,size)
+        for a in ('ival','_Bits__sz','mask'):
+            object.__setattr__(self,a,getattr(b,a))
+
+    def __setattr__(self,a,v):
+        raise AttributeError("interned Bits constant is read-only")
+
+    def __setitem__(self,i,v):
+        raise TypeError("interned Bits constant is read-only")
+
+    def __reduce__(self):
+        return (Bits.const,(self.ival,self.size))
+
+    def __iand__(self,rvalue):
+        return Bits(self).__iand__(rvalue)
+
+    def __ior__(self,rvalue):
+        return Bits(self).__ior__(rvalue)
+
+    def __ixor__(self,rvalue):
+        return Bits(self).__ixor__(rvalue)
+
+    def __iadd__(self,rvalue):
+        return Bits(self).__iadd__(rvalue)
+
+    def __isub__(self,rvalue):
+        return Bits(self).__isub__(rvalue)
+
+    def rol_(self,n):
+        return Bits(self).rol_(n)
+
+    def ror_(self,n):
+        return Bits(self).ror_(n)
+
+
+#------------------------------------------------------------------------------
+class BitPermutation(object):
+    """The BitPermutation class is a bit-gather plan compiled from an index
+       table, where output bit k is input bit table[k].
+
+       Attributes:
+
+       table: the tuple of input bit indices.
+       size: input bit length (defaults to max(table)+1).
+       outsize: output bit length (len(table)).
+       shifts: list of (mask,lshift,rshift) when the plan is applied as
+               masked shifts of all input bits that move by the same amount.
+       tables: list of (pos,T) when the plan is applied as lookups of every
+               input byte (at bit position pos) in a 256-entry table T.
+
+       Note:
+
+       The cheapest method is chosen at compile time unless method is
+       'shifts' or 'tables': masked shifts when few distinct bit moves exist
+       (runs of contiguous bits), byte lookup tables otherwise (8 lookups
+       for a 64-bit permutation).
+       A BitPermutation can be used as an index of Bits objects (b[perm]) or
+       called directly on Bits or int values. It also behaves like the
+       sequence of its indices, so that Poly objects can be indexed as well.
+    """
+
+    def __init__(self,table,size=None,method=None):
+        assert method in (None,'shifts','tables')
+        self.table = tuple(table)
+        if size is None:
+            size = max(self.table)+1
+        self.size = size
+        self.outsize = len(self.table)
+        moves = {}
+        for k,t in enumerate(self.table):
+            moves[k-t] = moves.get(k-t,0)|(1<<t)
+        self.shifts = [(m,max(d,0),max(-d,0)) for (d,m) in sorted(moves.items())]
+        self.tables = []
+        nbytes = (size+7)>>3
+        if method is None:
+            method = 'tables' if len(self.shifts)>nbytes else 'shifts'
+        if method=='tables':
+            self.shifts = None
+            for pos in range(0,size,8):
+                src = [(k,t-pos) for k,t in enumerate(self.table) if pos<=t<pos+8]
+                if not src: continue
+                T = [0]*256
+                for b in range(256):
+                    r = 0
+                    for k,s in src:
+                        r |= ((b>>s)&1)<<k
+                    T[b] = r
+                self.tables.append((pos,tuple(T)))
+
+    def __len__(self):
+        return self.outsize
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def __getitem__(self,k):
+        return self.table[k]
+
+    def __repr__(self):
+        c = self.__class__
+        m = 'shifts' if self.shifts is not None else 'tables'
+        return '<%s instance with %s (len=%d)>'%(c,m,self.outsize)
+
+    def apply(self,v):
+        "returns the int gathered from input int v."
+        r = 0
+        if self.shifts is not None:
+            for m,l,s in self.shifts:
+                r |= ((v&m)<<l)>>s
+        else:
+            for pos,T in self.tables:
+                r |= T[(v>>pos)&0xff]
+        return r
+
+    def __call__(self,x):
+        if isinstance(x,Bits):
+            return Bits(self.apply(x.ival),self.outsize)
+        return self.apply(x)
+
+#------------------------------------------------------------------------------
+class BitsArray(object):
+    """The BitsArray class represents a sequence of N words of fixed bit length.
+
+       Attributes:
+
+       data: the words buffer, an array.array (or numpy.ndarray if np=True
+             and numpy is available) of the smallest unsigned type that can
+             hold size bits.
+       size: bit length of every word (at most 64).
+       mask: mask of size bits.
+
+       Note:
+
+       All operators (^,&,|,+,-,~,<<,>>) and rotations (rol,ror) are applied
+       word-wise over the whole buffer, with a BitsArray of same length
+       and size or with a scalar (int or Bits) broadcasted to every word.
+       Additions and subtractions are performed modulo 2**size.
+       Elements are returned as Bits objects.
+    """
+
+    __slots__ = ['data','size','mask']
+
+    def __init__(self,v=0,size=64,np=False):
+        """
+        BitsArray instance can be initialized from:
+
+        - int value N: a zero-filled array of N words.
+        - BitsArray: a copy of the given array.
+        - iterable of ints or Bits objects.
+        """
+        if isinstance(v,BitsArray):
+            size,np = v.size,v.np
+        if not 0<size<=64:
+            raise ValueError(size)
+        self.size = size
+        self.mask = (1<<size)-1
+        if isinstance(v,BitsArray):
+            v = v.data
+        elif isinstance(v,int):
+            v = [0]*v
+        else:
+            v = [int(x)&self.mask for x in v]
+        if np and numpy is not None:
+            self.data = numpy.array(v,dtype='uint%d'%self.itemsize)
+        else:
+            self.data = array(self.typecode,v)
+
+    @property
+    def itemsize(self):
+        "bit length of the words in the data buffer."
+        for n in (8,16,32,64):
+            if self.size<=n: return n
+
+    @property
+    def typecode(self):
+        "array.array typecode of the data buffer."
+        for t in 'BHILQ':
+            if array(t).itemsize*8==self.itemsize: return t
+
+    @property
+    def np(self):
+        return numpy is not None and isinstance(self.data,numpy.ndarray)
+
+    @classmethod
+    def frombytes(cls,b,size=64,bigend=False,np=False):
+        """load a sequence of bytes as consecutive little-endian (default)
+           or big-endian words of size 8, 16, 32 or 64.
+        """
+        obj = cls(0,size,np)
+        if obj.itemsize!=size:
+            raise ValueError(size)
+        a = array(obj.typecode)
+        a.frombytes(bytes(b))
+        if bigend!=(sys.byteorder=='big'): a.byteswap()
+        if obj.np: a = numpy.array(a,dtype=obj.data.dtype)
+        obj.data = a
+        return obj
+
+    def tobytes(self,bigend=False):
+        "returns the data buffer as little-endian (default) or big-endian words."
+        a = array(self.typecode,self.tolist())
+        if bigend!=(sys.byteorder=='big'): a.byteswap()
+        return a.tobytes()
+
+    def tolist(self):
+        "returns the python list of int words."
+        return [int(x) for x in self.data]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        c = self.__class__
+        return '<%s instance with size=%d (len=%d)>'%(c,self.size,len(self))
+
+    def __iter__(self):
+        for x in self.data:
+            yield Bits(int(x),self.size)
+
+    def __getitem__(self,i):
+        if isinstance(i,slice):
+            x = self.data[i]
+            return self._new(x.copy() if self.np else x)
+        return Bits(int(self.data[i]),self.size)
+
+    def __setitem__(self,i,v):
+        if isinstance(v,Bits): v = v.ival
+        self.data[i] = v&self.mask
+
+    def __eq__(self,a):
+        if not isinstance(a,BitsArray): return False
+        return self.size==a.size and self.tolist()==a.tolist()
+
+    def __ne__(self,a):
+        return not (self==a)
+
+    def _new(self,data):
+        res = self.__class__.__new__(self.__class__)
+        res.size = self.size
+        res.mask = self.mask
+        res.data = data
+        return res
+
+    def _scalar(self,v):
+        return self.data.dtype.type(v) if self.np else v
+
+    def _map(self,f,rvalue=None):
+        # apply f word-wise, with rvalue either None (numpy only), a scalar
+        # or another BitsArray. Without numpy, the whole buffer is processed
+        # at once as a single python int (SWAR, as for Poly):
+        m = self.mask
+        if rvalue is None:
+            y = None
+        elif isinstance(rvalue,BitsArray):
+            if rvalue.size!=self.size or len(rvalue)!=len(self):
+                raise ValueError
+            y = rvalue.data
+        else:
+            if isinstance(rvalue,Bits): rvalue = rvalue.ival
+            y = self._scalar(rvalue&m)
+        if self.np:
+            x = f(self.data) if y is None else f(self.data,y)
+            if self.itemsize!=self.size: x = x&self._scalar(m)
+            return x
+        # whole buffer as a single python int (SWAR):
+        a = self._raw()
+        b = self._lanes(y) if isinstance(y,int) else self._raw(y)
+        if f is operator.add or f is operator.sub:
+            # keep carries/borrows inside every word:
+            H = self._lanes(1<<(self.size-1))
+            L = self._lanes(m)^H
+            if f is operator.add:
+                return self._fromraw(((a&L)+(b&L))^((a^b)&H))
+            return self._fromraw(((a|H)-(b&L))^((a^b^H)&H))
+        return self._fromraw(f(a,b))
+
+    def _raw(self,data=None):
+        # the whole buffer as a python int (word i at bit i*itemsize):
+        if data is None: data = self.data
+        return int.from_bytes(data.tobytes(),sys.byteorder)
+
+    def _fromraw(self,v):
+        # returns the array.array buffer of raw python int v:
+        a = array(self.typecode)
+        a.frombytes(v.to_bytes(len(self.data)*(self.itemsize>>3),sys.byteorder))
+        return a
+
+    def _lanes(self,v):
+        # python int with every word of the buffer equal to v:
+        w = self.itemsize
+        return v*(((1<<(w*len(self.data)))-1)//((1<<w)-1))
+
+    def __xor__(self,rvalue):
+        return self._new(self._map(operator.xor,rvalue))
+    def __and__(self,rvalue):
+        return self._new(self._map(operator.and_,rvalue))
+    def __or__(self,rvalue):
+        return self._new(self._map(operator.or_,rvalue))
+    def __add__(self,rvalue):
+        return self._new(self._map(operator.add,rvalue))
+    def __sub__(self,rvalue):
+        return self._new(self._map(operator.sub,rvalue))
+
+    __rxor__ = __xor__
+    __rand__ = __and__
+    __ror__  = __or__
+    __radd__ = __add__
+
+    def __ixor__(self,rvalue):
+        self.data = self._map(operator.xor,rvalue)
+        return self
+    def __iand__(self,rvalue):
+        self.data = self._map(operator.and_,rvalue)
+        return self
+    def __ior__(self,rvalue):
+        self.data = self._map(operator.or_,rvalue)
+        return self
+    def __iadd__(self,rvalue):
+        self.data = self._map(operator.add,rvalue)
+        return self
+    def __isub__(self,rvalue):
+        self.data = self._map(operator.sub,rvalue)
+        return self
+
+    def __invert__(self):
+        return self.__xor__(self.mask)
+
+    def __lshift__(self,n):
+        if self.np:
+            n = self._scalar(n)
+            return self._new(self._map(lambda x:x<<n))
+        m = self._lanes((self.mask<<n)&self.mask)
+        return self._new(self._fromraw((self._raw()<<n)&m))
+    def __rshift__(self,n):
+        if self.np:
+            n = self._scalar(n)
+            return self._new(self._map(lambda x:x>>n))
+        m = self._lanes(self.mask>>n)
+        return self._new(self._fromraw((self._raw()>>n)&m))
+
+    def rol(self,n):
+        "returns a new array with all words rotated left by n bits."
+        n = n%self.size
+        if n==0: return BitsArray(self)
+        return self<<n | self>>(self.size-n)
+
+    def ror(self,n):
+        "returns a new array with all words rotated right by n bits."
+        return self.rol(self.size-(n%self.size))
+
+#------------------------------------------------------------------------------
+class BitReader(object):
+    """The BitReader class reads sequences of bits of arbitrary length from
+       a binary stream (any object with a read(n) method returning bytes).
+
+       Attributes:
+
+       stream: the underlying binary stream.
+       bitorder: -1 (default) to read bits of every byte from msb to lsb
+                 (*bitstream* mode), or +1 to read them from lsb to msb
+                 (see :meth:`Bits.load`).
+       bufsize: number of bytes read from stream when more bits are needed.
+       bitcnt: number of bits already returned.
+
+       Note:
+
+       At most bufsize bytes (plus the requested bits) are held in memory,
+       so that large streams can be processed at constant memory.
+    """
+
+    def __init__(self,stream,bitorder=-1,bufsize=1024):
+        assert bitorder in (-1,1)
+        self.stream = stream
+        self.bitorder = bitorder
+        self.bufsize = bufsize
+        self.bitcnt = 0
+        self._acc = 0
+        self._n = 0
+
+    def _fill(self,n):
+        # load bytes from stream until at least n bits are available:
+        while self._n<n:
+            b = self.stream.read(max(self.bufsize,(n-self._n+7)>>3))
+            if not b: return False
+            if self.bitorder<0: b = bytes(b).translate(revtab)
+            self._acc |= int.from_bytes(b,'little')<<self._n
+            self._n += len(b)*8
+        return True
+
+    def read(self,n=-1):
+        """returns the next n bits (or all remaining bits if n<0) as a Bits
+           object. The returned object is shorter than n only when the end
+           of stream is reached.
+        """
+        if n<0:
+            while self._fill(self._n+1): pass
+            n = self._n
+        else:
+            self._fill(n)
+            n = min(n,self._n)
+        v = self._acc&((1<<n)-1)
+        self._acc >>= n
+        self._n -= n
+        self.bitcnt += n
+        return Bits(v,n)
+
+    def iterbits(self,n):
+        "iterate over all n-bits sequences (the last one might be shorter)."
+        while 1:
+            b = self.read(n)
+            if b.size==0: break
+            yield b
+            if b.size<n: break
+
+#------------------------------------------------------------------------------
+class BitWriter(object):
+    """The BitWriter class writes sequences of bits of arbitrary length to
+       a binary stream (any object with a write(bytes) method).
+
+       Attributes:
+
+       stream: the underlying binary stream.
+       bitorder: -1 (default) to write bits of every byte from msb to lsb
+                 (*bitstream* mode), or +1 to write them from lsb to msb.
+       bufsize: number of bytes buffered before writing to stream.
+       bitcnt: number of bits written so far.
+
+       Note:
+
+       Pending bits are written only when bufsize bytes are complete, or
+       when :meth:`flush` or :meth:`close` are called. Closing the writer
+       pads the last byte with 0 bits (the underlying stream is left open).
+    """
+
+    def __init__(self,stream,bitorder=-1,bufsize=1024):
+        assert bitorder in (-1,1)
+        self.stream = stream
+        self.bitorder = bitorder
+        self.bufsize = bufsize
+        self.bitcnt = 0
+        self._acc = 0
+        self._n = 0
+
+    def write(self,b,size=None):
+        """append the Bits b (or int b of given size) to the stream and
+           returns the number of bits written.
+        """
+        if isinstance(b,Bits):
+            v,size = b.int(),b.size
+        else:
+            if size is None: raise ValueError("size is needed for int input")
+            v = b&((1<<size)-1)
+        self._acc |= v<<self._n
+        self._n += size
+        self.bitcnt += size
+        if self._n>=(self.bufsize<<3): self._write(self._n>>3)
+        return size
+
+    def _write(self,l):
+        # write the l first bytes of pending bits:
+        n = l<<3
+        b = (self._acc&((1<<n)-1)).to_bytes(l,'little')
+        if self.bitorder<0: b = b.translate(revtab)
+        self.stream.write(b)
+        self._acc >>= n
+        self._n -= n
+
+    def flush(self):
+        "write all pending complete bytes to the stream."
+        self._write(self._n>>3)
+        if hasattr(self.stream,'flush'): self.stream.flush()
+
+    def close(self):
+        """write all pending bits to the stream, padding the last byte
+           with 0s. Returns the number of padding bits.
+        """
+        p = (-self._n)%8
+        self._n += p
+        self.flush()
+        return p
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+#------------------------------------------------------------------------------
+class BitsBuilder(BitWriter):
+    """The BitsBuilder class accumulates Bits parts and builds their
+       concatenation (same as b0//b1//...//bn) at once in linear time.
+
+       Note:
+
+       Parts are appended with :meth:`write` (or the //= operator) and
+       can be Bits objects, sized ints (write(v,size)) or ints (converted
+       as Bits(v)). The resulting Bits object is returned by :meth:`bits`.
+    """
+
+    def __init__(self,L=None,bufsize=1024):
+        BitWriter.__init__(self,BytesIO(),1,bufsize)
+        if L is not None:
+            for b in L: self.write(b)
+
+    def write(self,b,size=None):
+        if size is None and not isinstance(b,Bits): b = Bits(b)
+        return BitWriter.write(self,b,size)
+
+    def __ifloordiv__(self,b):
+        self.write(b)
+        return self
+
+    def __len__(self):
+        return self.bitcnt
 
+    def bits(self):
+        "returns the concatenation of all parts as a Bits object."
+        buf = self.stream.getvalue()
+        v = int.from_bytes(buf,'little')|(self._acc<<(len(buf)*8))
+        return Bits(v,self.bitcnt)
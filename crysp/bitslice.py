@@ -0,0 +1,264 @@
+# This code is part of crysp
+# Copyright (C) 2026 Axel Tillequin (bdcht3@gmail.com)
+# published under GPLv2 license
+
+# Bitsliced evaluation of block ciphers:
+# N blocks of size bits are transposed into size bit-planes, each plane being
+# a N-bit python integer (bit i of plane j is bit j of block i). Every boolean
+# operation on planes thus processes the N blocks at once, S-boxes being
+# evaluated as boolean circuits rather than table lookups.
+
+from crysp.bits import Bits,revtab
+from crysp.padding import pkcs7
+from crysp.mode import DefaultCounter
+from crysp.utils.xor import xor
+from crysp import serpent,des
+
+__all__ = ['transpose','untranspose','join','split','Circuit',
+           'BitslicedSerpent','BitslicedDES',
+           'ecb_enc','ecb_dec','ctr']
+
+# transpose in/out helpers:
+#--------------------------
+def transpose(blocks,size):
+    """returns the list of size bit-planes of the list of size-bit int blocks.
+       Bit i of plane j is bit j of blocks[i].
+    """
+    if not blocks: return [0]*size
+    fmt = '0%db'%size
+    rows = [format(b,fmt) for b in reversed(blocks)]
+    planes = [int(''.join(c),2) for c in zip(*rows)]
+    planes.reverse()
+    return planes
+
+def untranspose(planes,n):
+    "returns the list of n int blocks from their bit-planes (see transpose)."
+    if n==0: return []
+    fmt = '0%db'%n
+    rows = [format(p,fmt) for p in reversed(planes)]
+    blocks = [int(''.join(c),2) for c in zip(*rows)]
+    blocks.reverse()
+    return blocks
+
+def join(planes,n):
+    "concatenate n-bit planes into a single int (planes[0] at lsb)."
+    w = 0
+    for p in reversed(planes):
+        w = (w<<n)|p
+    return w
+
+def split(w,n,count):
+    "split int w into count n-bit planes (inverse of join)."
+    m = (1<<n)-1
+    return [(w>>(j*n))&m for j in range(count)]
+
+#------------------------------------------------------------------------------
+def _anf(f):
+    """returns the monomials (as bitmasks of input variables) of the
+       algebraic normal form of the boolean function with truth table f.
+    """
+    a = list(f)
+    h = 1
+    while h<len(a):
+        for i in range(len(a)):
+            if i&h: a[i] ^= a[i^h]
+        h <<= 1
+    return [s for s,c in enumerate(a) if c]
+
+class Circuit(object):
+    """boolean circuit of a nin-bit to nout-bit S-box given by its table.
+       Each output bit is evaluated from its algebraic normal form, ie as a
+       xor of and-products of the input bits. Calling the circuit with
+       nin bit-planes X and the all-ones plane returns the nout output planes.
+    """
+    def __init__(self,table,nin,nout):
+        assert len(table)==1<<nin
+        self.nin = nin
+        self.nout = nout
+        self.anf = [_anf([(y>>k)&1 for y in table]) for k in range(nout)]
+
+    def __call__(self,X,ones):
+        # m[s] is the and-product of inputs X[i] for all bits i set in s:
+        m = [ones]
+        for x in X:
+            m += [t&x for t in m]
+        res = []
+        for mons in self.anf:
+            y = 0
+            for s in mons: y ^= m[s]
+            res.append(y)
+        return res
+
+# -----------------------------------------------------------------------------
+# Serpent: the 32 S-boxes of a round act on bit j of the 4 words X0..X3.
+# With N blocks, the 32 planes of word k are joined into a 32N-bit int so that
+# every round is evaluated over 4 ints exactly like the reference bitsliced
+# Serpent, word rotations and shifts becoming multiples of N.
+_Serpent_S = [Circuit(t,4,4) for t in serpent._Sboxes]
+_Serpent_Sinv = [Circuit(t,4,4) for t in serpent._Sinvboxes]
+
+class BitslicedSerpent(object):
+    size = 128
+    blocksize = 128
+
+    def __init__(self,K):
+        self.keys = serpent.Serpent(K).keys
+        self._n = None
+
+    def _setup(self,n):
+        "returns the round keys as masks of joined 32n-bit words."
+        if self._n!=n:
+            ones = (1<<n)-1
+            self._rk = []
+            for k in self.keys:
+                W = []
+                for w in k.split(32):
+                    W.append(join([ones if w.bit(j) else 0 for j in range(32)],n))
+                self._rk.append(W)
+            self._n = n
+        return self._rk
+
+    def _load(self,M):
+        assert len(M)%16==0
+        blocks = [int.from_bytes(M[i:i+16],'little') for i in range(0,len(M),16)]
+        n = len(blocks)
+        P = transpose(blocks,128)
+        return n,[join(P[k:k+32],n) for k in range(0,128,32)]
+
+    def _store(self,n,W):
+        P = []
+        for w in W: P.extend(split(w,n,32))
+        return b''.join([b.to_bytes(16,'little') for b in untranspose(P,n)])
+
+    def enc(self,M):
+        "encrypt all blocks of M (a multiple of 16 bytes) in one pass."
+        n,W = self._load(M)
+        if n==0: return b''
+        K = self._setup(n)
+        ones = (1<<(32*n))-1
+        for i in range(31):
+            W = [w^k for w,k in zip(W,K[i])]
+            W = _L(_Serpent_S[i%8](W,ones),n,ones)
+        W = [w^k for w,k in zip(W,K[31])]
+        W = [w^k for w,k in zip(_Serpent_S[7](W,ones),K[32])]
+        return self._store(n,W)
+
+    def dec(self,C):
+        "decrypt all blocks of C (a multiple of 16 bytes) in one pass."
+        n,W = self._load(C)
+        if n==0: return b''
+        K = self._setup(n)
+        ones = (1<<(32*n))-1
+        W = [w^k for w,k in zip(W,K[32])]
+        W = [w^k for w,k in zip(_Serpent_Sinv[7](W,ones),K[31])]
+        for i in range(30,-1,-1):
+            W = _Serpent_Sinv[i%8](_Linv(W,n,ones),ones)
+            W = [w^k for w,k in zip(W,K[i])]
+        return self._store(n,W)
+
+def _rol(w,r,n,ones):
+    return ((w<<(r*n))|(w>>((32-r)*n)))&ones
+
+def _L(W,n,ones):
+    X0,X1,X2,X3 = W
+    X0 = _rol(X0,13,n,ones)
+    X2 = _rol(X2,3,n,ones)
+    X1 ^= X0^X2
+    X3 ^= X2^((X0<<(3*n))&ones)
+    X1 = _rol(X1,1,n,ones)
+    X3 = _rol(X3,7,n,ones)
+    X0 ^= X1^X3
+    X2 ^= X3^((X1<<(7*n))&ones)
+    X0 = _rol(X0,5,n,ones)
+    X2 = _rol(X2,22,n,ones)
+    return [X0,X1,X2,X3]
+
+def _Linv(W,n,ones):
+    X0,X1,X2,X3 = W
+    X2 = _rol(X2,32-22,n,ones)
+    X0 = _rol(X0,32-5,n,ones)
+    X2 ^= X3^((X1<<(7*n))&ones)
+    X0 ^= X1^X3
+    X3 = _rol(X3,32-7,n,ones)
+    X1 = _rol(X1,32-1,n,ones)
+    X3 ^= X2^((X0<<(3*n))&ones)
+    X1 ^= X0^X2
+    X2 = _rol(X2,32-3,n,ones)
+    X0 = _rol(X0,32-13,n,ones)
+    return [X0,X1,X2,X3]
+
+# -----------------------------------------------------------------------------
+# DES: each S-box circuit takes 6 planes of the expanded R (xored with the
+# subkey) and returns 4 planes of the P-box input. Permutations IP, E, P and
+# IPinv are free, they only reorder the list of planes.
+def _des_table(n):
+    T = []
+    for u in range(64):
+        i = ((u>>5)&1)|((u&1)<<1)
+        j = ((u>>4)&1)|(((u>>3)&1)<<1)|(((u>>2)&1)<<2)|(((u>>1)&1)<<3)
+        T.append(des.S(n,(i<<4)+j)[::-1].ival)
+    return T
+
+_DES_S = [Circuit(_des_table(n),6,4) for n in range(8)]
+
+class BitslicedDES(object):
+    size = 64
+    blocksize = 64
+
+    def __init__(self,K):
+        assert len(K)==self.size//8
+        k = des.PC1(Bits(K,self.size))
+        self.subkeys = [des.subkey(k,r).bitlist() for r in range(16)]
+
+    def _crypt(self,M,subkeys):
+        assert len(M)%8==0
+        M = bytes(M).translate(revtab)
+        blocks = [int.from_bytes(M[i:i+8],'little') for i in range(0,len(M),8)]
+        n = len(blocks)
+        if n==0: return b''
+        ones = (1<<n)-1
+        P = transpose(blocks,64)
+        P = [P[i] for i in des.IP_table.table]
+        L,R = P[:32],P[32:]
+        E = des.E_table.table
+        for k in subkeys:
+            s = [R[e]^(ones&-b) for e,b in zip(E,k)]
+            Z = []
+            for i,S in enumerate(_DES_S):
+                Z.extend(S(s[6*i:6*i+6],ones))
+            L = [l^Z[p] for l,p in zip(L,des.P_table.table)]
+            L,R = R,L
+        P = R+L
+        P = [P[i] for i in des.IPinv_table.table]
+        C = b''.join([b.to_bytes(8,'little') for b in untranspose(P,n)])
+        return C.translate(revtab)
+
+    def enc(self,M):
+        "encrypt all blocks of M (a multiple of 8 bytes) in one pass."
+        return self._crypt(M,self.subkeys)
+
+    def dec(self,C):
+        "decrypt all blocks of C (a multiple of 8 bytes) in one pass."
+        return self._crypt(C,self.subkeys[::-1])
+
+# batch modes of operation:
+#--------------------------
+def ecb_enc(cipher,M,pad=pkcs7):
+    "ECB encryption of padded M with a bitsliced cipher, in one pass."
+    return cipher.enc(b''.join(pad(l=cipher.blocksize).iterblocks(M)))
+
+def ecb_dec(cipher,C,pad=pkcs7):
+    "ECB decryption of C with a bitsliced cipher, in one pass."
+    return pad(l=cipher.blocksize).remove(cipher.dec(C))
+
+def ctr(cipher,M,counter):
+    """CTR encryption/decryption of M with a bitsliced cipher and a counter
+       (see crysp.mode.CTR): all keystream blocks are computed in one pass.
+    """
+    l = cipher.blocksize//8
+    if isinstance(counter,bytes):
+        counter = DefaultCounter(l,counter)
+    n = (len(M)+l-1)//l
+    counter.reset()
+    K = cipher.enc(b''.join([counter() for _ in range(n)]))
+    return xor(M,K)
@@ -58,7 +58,7 @@ class Blake(object):
             c64.dim = 8
             self.c = c64.split(32)
             for i in range(0,16,2):
-                self.c.ival[i:i+2] = self.c.ival[i+1],self.c.ival[i]
+                self.c.ival[i],self.c.ival[i+1] = self.c.ival[i+1],self.c.ival[i]
             self.rounds = 14
         self.IV  = Poly([x.int() for x in SHA2(self.size).H],self.wsize)
         self.padmethod = Blakepadding(self.size)
@@ -82,14 +82,14 @@ class Blake(object):
             p,q = sigma[r%10][ii:ii+2]
             xx = (32,25,16,11) if self.size>256 else (16,12,8,7)
             a,b,c,d = (x for x in v[ja,jb,jc,jd])
-            a = a+b+(W[p]^self.c.e(q))
-            d = ror(d^a,xx[0])
-            c = c+d
-            b = ror(b^c,xx[1])
-            a = a+b+(W[q]^self.c.e(p))
-            d = ror(d^a,xx[2])
-            c = c+d
-            b = ror(b^c,xx[3])
+            a += b; a += W[p]^self.c.e(q)
+            d ^= a; d.ror_(xx[0])
+            c += d
+            b ^= c; b.ror_(xx[1])
+            a += b; a += W[q]^self.c.e(p)
+            d ^= a; d.ror_(xx[2])
+            c += d
+            b ^= c; b.ror_(xx[3])
             v[ja,jb,jc,jd] = a,b,c,d
         for W in self.iterblocks(M,bitlen=bitlen,padding=padding):
             # initialize v[0...15]:
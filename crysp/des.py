@@ -3,6 +3,7 @@
 # published under GPLv2 license
 
 from crysp.bits import *
+from crysp.bits import revtab
 
 # -----------------------------------------------------------------------------
 # 3-DES with all keying options
@@ -14,16 +15,18 @@ class TDEA(object):
         if len(K1)>8:
             assert K2 is None
             assert K3 is None
-            K1,K2,K3 = K1[:8],K1[8:],K1[16:]
+            K1,K2,K3 = K1[:8],K1[8:16],K1[16:24]
             if K3==b'': K3=K1
         if K2 is None:
             assert K3 is None
             K2 = K1
         if K3 is None:
             K3 = K1
-        self.E1 = DES(K1)
-        self.E2 = DES(K2)
-        self.E3 = DES(K3)
+        # repeated keys (1-key and 2-key 3DES) share the same DES schedule:
+        E = {}
+        for K in (K1,K2,K3):
+            if bytes(K) not in E: E[bytes(K)] = DES(K)
+        self.E1,self.E2,self.E3 = (E[bytes(K)] for K in (K1,K2,K3))
 
     def enc(self,M):
         return self.E3.enc(self.E2.dec(self.E1.enc(M)))
@@ -31,6 +34,12 @@ class TDEA(object):
     def dec(self,C):
         return self.E1.dec(self.E2.enc(self.E3.dec(C)))
 
+    def fast_enc(self,M):
+        return self.E3.fast_enc(self.E2.fast_dec(self.E1.fast_enc(M)))
+
+    def fast_dec(self,C):
+        return self.E1.fast_dec(self.E2.fast_enc(self.E3.fast_dec(C)))
+
 # -----------------------------------------------------------------------------
 # DES block cipher primitive
 class DES(object):
@@ -40,18 +49,33 @@ class DES(object):
     def __init__(self,K):
         assert len(K)==self.size//8
         self.K = Bits(K,self.size)
+        self.subkeys = keyschedule(self.K)
+        self.fastkeys = [k.ival for k in self.subkeys]
 
     def enc(self,M):
+        return self._crypt(M,self.subkeys)
+
+    def dec(self,C):
+        return self._crypt(C,self.subkeys[::-1])
+
+    def fast_enc(self,M):
+        "SP-box based encryption of 8-byte block M (see _spcrypt)."
+        assert len(M)==8
+        return _spcrypt(M,self.fastkeys)
+
+    def fast_dec(self,C):
+        "SP-box based decryption of 8-byte block C (see _spcrypt)."
+        assert len(C)==8
+        return _spcrypt(C,self.fastkeys[::-1])
+
+    def _crypt(self,M,subkeys):
         M = Bits(M)
         assert M.size==self.blocksize
-        K = self.K
-        k = PC1(K)
         blk = IP(M)
         L = blk[0:32]
         R = blk[32:64]
-        for r in range(16):
-            fout = F(R,k,r)
-            L = L^fout
+        for fk in subkeys:
+            L ^= _F(R,fk)
             L,R = R,L
         L,R = R,L
         C = Bits(0,64)
@@ -59,119 +83,128 @@ class DES(object):
         C[32:64] = R
         return (IPinv(C)).bytes()
 
-    def dec(self,C):
-        C = Bits(C)
-        assert C.size==self.blocksize
-        K = self.K
-        k = PC1(K)
-        blk = IP(C)
-        L = blk[0:32]
-        R = blk[32:64]
-        for r in reversed(range(16)):
-            fout = F(R,k,r)
-            L = L^fout
-            L,R = R,L
-        L,R = R,L
-        M = Bits(0,64)
-        M[0:32] = L
-        M[32:64] = R
-        return (IPinv(M)).bytes()
-
 # DES internals:
 #---------------
 
+# cumulated left rotations of C and D for each round:
+_shifts = (1, 2, 4, 6, 8, 10, 12, 14, 15, 17, 19, 21, 23, 25, 27, 28)
+
 def subkey(k,r):
     C = k[0:28]
     D = k[28:56]
-    shifts = [1, 1, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 1]
-    s = sum(shifts[:r+1])
+    s = _shifts[r]
     C = C>>s | C<<(28-s)
     D = D>>s | D<<(28-s)
     return PC2(C//D)
 
+# S-box input row and column bits:
+_row = BitPermutation((5,0))
+_col = BitPermutation((4,3,2,1))
+
+def keyschedule(K):
+    "returns the list of the 16 round subkeys of 64-bit key K."
+    k = PC1(K)
+    return [subkey(k,r) for r in range(16)]
+
 def F(R,k,r):
+    "round function of R with the subkey of round r of (PC1-permuted) key k."
+    return _F(R,subkey(k,r))
+
+def _F(R,fk):
+    # round function with precomputed subkey fk:
     RE = E(R)
     Z  = Bits(0,32)
-    fk = subkey(k,r)
     s  = RE^fk
     ri,ro = 0,0
     for n in range(8):
         nri,nro = ri+6,ro+4
         x = s[ri:nri]
-        i = x[(5,0)].ival
-        j = x[(4,3,2,1)].ival
-        Z[ro:nro] = Bits(S(n,(i<<4)+j),4)[::-1].ival
+        i = x[_row].ival
+        j = x[_col].ival
+        Z[ro:nro] = S(n,(i<<4)+j)[::-1].ival
         ri,ro = nri,nro
     return P(Z)
 
+IP_table = BitPermutation([
+    57, 49, 41, 33, 25, 17,  9,  1,
+    59, 51, 43, 35, 27, 19, 11,  3,
+    61, 53, 45, 37, 29, 21, 13,  5,
+    63, 55, 47, 39, 31, 23, 15,  7,
+    56, 48, 40, 32, 24, 16,  8,  0,
+    58, 50, 42, 34, 26, 18, 10,  2,
+    60, 52, 44, 36, 28, 20, 12,  4,
+    62, 54, 46, 38, 30, 22, 14,  6],method='tables')
+
 def IP(M):
     assert len(M)==64
-    table = [57, 49, 41, 33, 25, 17, 9,  1,
-    	     59, 51, 43, 35, 27, 19, 11, 3,
-    	     61, 53, 45, 37, 29, 21, 13, 5,
-    	     63, 55, 47, 39, 31, 23, 15, 7,
-    	     56, 48, 40, 32, 24, 16, 8,  0,
-    	     58, 50, 42, 34, 26, 18, 10, 2,
-    	     60, 52, 44, 36, 28, 20, 12, 4,
-    	     62, 54, 46, 38, 30, 22, 14, 6]
-    return M[table]
+    return M[IP_table]
+
+IPinv_table = BitPermutation([
+    39,  7, 47, 15, 55, 23, 63, 31,
+    38,  6, 46, 14, 54, 22, 62, 30,
+    37,  5, 45, 13, 53, 21, 61, 29,
+    36,  4, 44, 12, 52, 20, 60, 28,
+    35,  3, 43, 11, 51, 19, 59, 27,
+    34,  2, 42, 10, 50, 18, 58, 26,
+    33,  1, 41,  9, 49, 17, 57, 25,
+    32,  0, 40,  8, 48, 16, 56, 24],method='tables')
 
 def IPinv(M):
     assert len(M)==64
-    table = [39,  7, 47, 15, 55, 23, 63, 31,
-	     38,  6, 46, 14, 54, 22, 62, 30,
-	     37,  5, 45, 13, 53, 21, 61, 29,
-	     36,  4, 44, 12, 52, 20, 60, 28,
-	     35,  3, 43, 11, 51, 19, 59, 27,
-	     34,  2, 42, 10, 50, 18, 58, 26,
-	     33,  1, 41,  9, 49, 17, 57, 25,
-	     32,  0, 40,  8, 48, 16, 56, 24]
-    return M[table]
+    return M[IPinv_table]
+
+PC1_table = BitPermutation([
+    56, 48, 40, 32, 24, 16,  8,
+     0, 57, 49, 41, 33, 25, 17,
+     9,  1, 58, 50, 42, 34, 26,
+    18, 10,  2, 59, 51, 43, 35,
+    62, 54, 46, 38, 30, 22, 14,
+     6, 61, 53, 45, 37, 29, 21,
+    13,  5, 60, 52, 44, 36, 28,
+    20, 12,  4, 27, 19, 11,  3],method='tables')
 
 def PC1(K):
-    table = [56, 48, 40, 32, 24, 16,  8,
-	      0, 57, 49, 41, 33, 25, 17,
-	      9,  1, 58, 50, 42, 34, 26,
-	     18, 10,  2, 59, 51, 43, 35,
-	     62, 54, 46, 38, 30, 22, 14,
-	      6, 61, 53, 45, 37, 29, 21,
-	     13,  5, 60, 52, 44, 36, 28,
-	     20, 12,  4, 27, 19, 11,  3]
-    return  K[table]
+    return  K[PC1_table]
+
+PC2_table = BitPermutation([
+    13, 16, 10, 23,  0,  4,
+     2, 27, 14,  5, 20,  9,
+    22, 18, 11,  3, 25,  7,
+    15,  6, 26, 19, 12,  1,
+    40, 51, 30, 36, 46, 54,
+    29, 39, 50, 44, 32, 47,
+    43, 48, 38, 55, 33, 52,
+    45, 41, 49, 35, 28, 31],method='tables')
 
 def PC2(K):
     assert len(K)==56
-    table = [13, 16, 10, 23,  0,  4,
-	      2, 27, 14,  5, 20,  9,
-	     22, 18, 11,  3, 25,  7,
-	     15,  6, 26, 19, 12,  1,
-	     40, 51, 30, 36, 46, 54,
-	     29, 39, 50, 44, 32, 47,
-	     43, 48, 38, 55, 33, 52,
-	     45, 41, 49, 35, 28, 31]
-    return  K[table]
+    return  K[PC2_table]
+
+E_table = BitPermutation([
+    31,  0,  1,  2,  3,  4,
+     3,  4,  5,  6,  7,  8,
+     7,  8,  9, 10, 11, 12,
+    11, 12, 13, 14, 15, 16,
+    15, 16, 17, 18, 19, 20,
+    19, 20, 21, 22, 23, 24,
+    23, 24, 25, 26, 27, 28,
+    27, 28, 29, 30, 31,  0],method='tables')
 
 def E(L):
     assert len(L)==32
-    table = [31,  0,  1,  2,  3,  4,
-	      3,  4,  5,  6,  7,  8,
-	      7,  8,  9, 10, 11, 12,
-	     11, 12, 13, 14, 15, 16,
-	     15, 16, 17, 18, 19, 20,
-	     19, 20, 21, 22, 23, 24,
-	     23, 24, 25, 26, 27, 28,
-	     27, 28, 29, 30, 31,  0]
-    return L[table]
+    return L[E_table]
+
+P_table = BitPermutation([
+    15,  6, 19, 20, 28, 11,
+    27, 16,  0, 14, 22, 25,
+     4, 17, 30,  9,  1,  7,
+    23, 13, 31, 26,  2,  8,
+    18, 12, 29,  5, 21, 10,
+     3, 24])
 
 def P(s):
     assert len(s)==32
-    table = [15, 6, 19, 20, 28, 11,
-	     27, 16, 0, 14, 22, 25,
-	     4, 17, 30, 9, 1, 7,
-	     23,13, 31, 26, 2, 8,
-	     18, 12, 29, 5, 21, 10,
-	     3, 24]
-    return  s[table]
+    return  s[P_table]
 
 def S(n,x):
     assert 0 <= n < 8
@@ -218,8 +251,35 @@ def S(n,x):
 	      7, 11, 4, 1, 9, 12, 14, 2, 0, 6, 10, 13, 15, 3, 5, 8,
 	      2, 1, 14, 7, 4, 10, 8, 13, 15, 12, 9, 0, 3, 5, 6, 11],
 	]
-    return Bits(boxes[n][x],4)
-
+    return Bits.const(boxes[n][x],4)
 
+# SP-box DES engine:
+#-------------------
+# Blocks are handled as plain ints in Bits order (bit i is DES bit i+1).
+# Each S-box is merged with the P permutation into a 64-entry table of 32-bit
+# masks (SP[n][x] is P of the output of S-box n on 6-bit input x placed at its
+# position), so that a round is the table-driven E expansion, a xor with
+# the subkey and eight lookups.
+def _spbox(n):
+    T = []
+    for x in range(64):
+        b = Bits(x,6)
+        i = b[_row].ival
+        j = b[_col].ival
+        T.append(P_table.apply(S(n,(i<<4)+j)[::-1].ival<<(4*n)))
+    return tuple(T)
 
+SP = tuple(_spbox(n) for n in range(8))
 
+def _spcrypt(M,fastkeys):
+    v = IP_table.apply(int.from_bytes(bytes(M).translate(revtab),'little'))
+    L,R = v&0xffffffff,v>>32
+    Ea = E_table.apply
+    SP0,SP1,SP2,SP3,SP4,SP5,SP6,SP7 = SP
+    for k in fastkeys:
+        s = Ea(R)^k
+        L ^= (SP0[s&63]^SP1[(s>>6)&63]^SP2[(s>>12)&63]^SP3[(s>>18)&63]^
+              SP4[(s>>24)&63]^SP5[(s>>30)&63]^SP6[(s>>36)&63]^SP7[s>>42])
+        L,R = R,L
+    v = IPinv_table.apply(R|(L<<32))
+    return v.to_bytes(8,'little').translate(revtab)
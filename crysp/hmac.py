@@ -5,6 +5,7 @@
 # published under GPLv2 license
 
 from crysp.bits import *
+from crysp.utils.xor import xor
 
 class HMAC(object):
     def __init__(self,h,k=None):
@@ -20,9 +21,7 @@ class HMAC(object):
     def __call__(self,m):
         assert self.K
         a = self.K
-        b = bytes(b'\x5c'*(self.h.blocksize//8))
-        opad = bytes([x^y for (x,y) in zip(a,b)])
-        b = bytes(b'\x36'*(self.h.blocksize//8))
-        ipad = bytes([x^y for (x,y) in zip(a,b)])
+        opad = xor(a,b'\x5c'*(self.h.blocksize//8))
+        ipad = xor(a,b'\x36'*(self.h.blocksize//8))
         h1 = self.h(ipad+bytes(m))
         return self.h(opad+h1)
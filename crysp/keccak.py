@@ -5,6 +5,7 @@
 # published under GPLv2 license
 
 from crysp.bits import *
+from crysp.utils.operators import concat
 
 from io import BytesIO
 
@@ -86,11 +87,11 @@ class Keccak(object):
             S = self.f(S^Ps)
 
         #Squeezing phase
-        Z = S.dump(r)
+        Z = BitsBuilder([S.dump(r)])
         while len(Z)<self.outlen:
             S = self.f(S)
-            Z = Z//S.dump(r)
-        return pack(Z[:self.outlen])
+            Z //= S.dump(r)
+        return pack(Z.bits()[:self.outlen])
 
     def iterblocks(self,M,bitlen=None):
         needed = len(M)*8
@@ -103,22 +104,12 @@ class Keccak(object):
                 b = Bits(M[-1:],size=needed%8)[::-1]
                 M = M[:needed//8]+bytes([b.ival])
         r = self.r
-        br,rr = divmod(r,8)
-        P = BytesIO(M)
-        # init iterator loop:
-        Pi = P.read(br)
-        Pb = Bits(0,size=0)
-        while len(Pi)>0:
-            # input message bitstream buffer:
-            Pb =  Pb//Bits(Pi,bitorder=1)
-            if len(Pb)>=needed:
-                Pb.size=needed
-                P.read() # consume all stream to exit loop
-            if len(Pb)>=r:
-                yield Pb[:r]
-                needed -= r
-                Pb = Pb[r:]
-            Pi = P.read(br)
+        # input message bitstream reader:
+        P = BitReader(BytesIO(M),bitorder=1)
+        while needed>=r:
+            yield P.read(r)
+            needed -= r
+        Pb = P.read(needed)
         # pad10*1 (with little-endian convention) :
         Pb = Pb//Bits(1)//Bits(0,size=r-len(Pb)-2)//Bits(1)
         yield Pb
@@ -170,11 +161,8 @@ class State(object):
 
     def dump(self,r):
         assert r<=(25*self.w)
-        i = 0
-        z = Bits(0,size=0)
-        while (i<25 and len(z)<=r):
-            z = z//self.lanes[i]
-            i += 1
+        n = min(25,r//self.w+1)
+        z = Bits(concat(self.lanes[:n]))
         z.size = r
         return z
 
@@ -199,12 +187,16 @@ def Round(A,RCi):
     D = [0]*5
     #θ step
     for x in range(0,5):
-          C[x] = A[x,0] ^ A[x,1] ^ A[x,2] ^ A[x,3] ^ A[x,4]
+          C[x] = A[x,0] ^ A[x,1]
+          C[x] ^= A[x,2]
+          C[x] ^= A[x,3]
+          C[x] ^= A[x,4]
     for x in range(0,5):
-          D[x] = C[(x-1)%5] ^ rot(C[(x+1)%5],1)
+          D[x] = rot(C[(x+1)%5],1)
+          D[x] ^= C[(x-1)%5]
     for x in range(0,5):
         for y in range(0,5):
-            A[x,y] = A[x,y] ^ D[x]
+            A[x,y] ^= D[x]
     #ρ and π steps
     B = State(A.w)
     for x in range(0,5):
@@ -213,16 +205,16 @@ def Round(A,RCi):
     #χ step
     for x in range(0,5):
         for y in range(0,5):
-            A[x,y] = B[x,y] ^ ((~B[x+1,y]) & B[x+2,y])
+            t = ~B[x+1,y]
+            t &= B[x+2,y]
+            t ^= B[x,y]
+            A[x,y] = t
     #ι step
-    A[0,0] = A[0,0] ^ RCi
+    A[0,0] ^= RCi
     return A
 
 def rot(l,n):
-    w = len(l)
-    sl = n%w
-    sr = w-sl
-    return (l<<sl)|(l>>sr)
+    return Bits(l).rol_(n)
 
 
 keccak_224 = Keccak(b=1600,c=448,len=224)
@@ -46,7 +46,10 @@ class MD4(object):
             W.extend([W[i] for i in (0,8,4,12,2,10,6,14,1,9,5,13,3,11,7,15)])
             for i in range(3*16):
                 r = i//16
-                T = rol(a+self.ft[r](b,c,d)+W[i]+self.K[r],self.st[r][i%4])
+                T = a+self.ft[r](b,c,d)
+                T += W[i]
+                T += self.K[r]
+                T.rol_(self.st[r][i%4])
                 a = d
                 d = c
                 c = b
@@ -94,7 +97,11 @@ class MD5(MD4):
             W.extend([W[i] for i in (0,7,14,5,12,3,10,1,8,15,6,13,4,11,2,9)])
             for i in range(4*16):
                 r = i//16
-                T = b+rol(a+self.ft[r](b,c,d)+W[i]+self.K[i],self.st[r][i%4])
+                T = a+self.ft[r](b,c,d)
+                T += W[i]
+                T += self.K[i]
+                T.rol_(self.st[r][i%4])
+                T += b
                 a = d
                 d = c
                 c = b
@@ -4,9 +4,14 @@
 # Copyright (C) 2013 Axel Tillequin (bdcht3@gmail.com) 
 # published under GPLv2 license
 
-from crysp.padding import nopadding,pkcs7
+from crysp.padding import nopadding,pkcs7,PaddingError
 from io import BytesIO
+from copy import copy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import os
 from crysp.bits import pack, unpack, Bits
+from crysp.utils.xor import xor, xor_into
 
 # -----------------------------------------------------------------------------
 # Mode of Operation Core class, default padding is nopadding.
@@ -29,32 +34,208 @@ class Mode(object):
     def dec(self,C):
         raise NotImplementedError
 
+    # map cipher function f (enc or dec) over all blocks of data, by chunks of
+    # chunksize blocks dispatched to an executor (thread or process pool),
+    # optionally xoring the results with prev:
+    def mapblocks(self,f,data,executor,chunksize=64,prev=None):
+        step = self.len*chunksize
+        I = range(0,len(data),step)
+        D = [data[i:i+step] for i in I]
+        P = [prev[i:i+step] for i in I] if prev is not None else repeat(None)
+        R = executor.map(_blocks_task,repeat(f),repeat(self.len),D,P)
+        return b''.join(R)
+
+    # streaming API (see Stream):
+    def encryptor(self):
+        raise NotImplementedError
+    def decryptor(self):
+        raise NotImplementedError
+
     # xor input byte strings (over min length):
     def xorstr(self,a,b):
-        a = bytes(a)
-        b = bytes(b)
-        return bytes([x^y for (x,y) in zip(a,b)])
+        return xor(a,b)
+
+def _blocks_task(f,l,data,prev=None):
+    "apply f on all l-byte blocks of data, and xor the result with prev."
+    R = b''.join([f(data[j:j+l]) for j in range(0,len(data),l)])
+    if prev is not None:
+        R = xor(R,prev)
+    return R
+
+# -----------------------------------------------------------------------------
+# Streaming contexts returned by Mode.encryptor()/decryptor(): update(data)
+# processes all complete blocks available and returns their output, keeping
+# the chaining state and the pending partial input (and at least the 'held'
+# last bytes, needed by padding removal or ciphertext stealing) for the next
+# call. finalize() processes the remaining input and closes the context.
+# Results are the same as the mode's enc/dec over the whole message.
+class Stream(object):
+    held = 0
+
+    def __init__(self,mode):
+        self.mode = mode
+        self.l = mode.len
+        self.pad = copy(mode.pad)
+        self.pad.reset()
+        self.buf = b''
+        self.done = False
+
+    def update(self,data):
+        if self.done: raise ValueError("stream already finalized")
+        buf = self.buf+bytes(data)
+        k = (max(len(buf)-self.held,0)//self.l)*self.l
+        self.buf = buf[k:]
+        return self.blocks(buf[:k]) if k>0 else b''
+
+    def finalize(self):
+        if self.done: raise ValueError("stream already finalized")
+        self.done = True
+        buf,self.buf = self.buf,b''
+        return self.final(buf)
+
+    def iterblocks(self,data):
+        l = self.l
+        for i in range(0,len(data),l):
+            yield data[i:i+l]
+
+    # process complete blocks:
+    def blocks(self,data):
+        raise NotImplementedError
+    # process the remaining input:
+    def final(self,data):
+        raise NotImplementedError
+
+    def padded(self,data):
+        P = self.pad.lastblock(data)
+        if len(P)%self.l>0:
+            raise PaddingError('input not a multiple of block size')
+        return P
+
+class ECBEncryptor(Stream):
+    def blocks(self,data):
+        enc = self.mode._cipher.enc
+        return b''.join([enc(b) for b in self.iterblocks(data)])
+    def final(self,data):
+        return self.blocks(self.padded(data))
+
+class ECBDecryptor(Stream):
+    held = 1
+    def blocks(self,data):
+        dec = self.mode._cipher.dec
+        return b''.join([dec(b) for b in self.iterblocks(data)])
+    def final(self,data):
+        assert len(data)%self.l==0
+        return self.pad.remove(self.blocks(data))
+
+class CBCEncryptor(Stream):
+    def __init__(self,mode):
+        super().__init__(mode)
+        self.head = self.chain = mode.IV
+    def blocks(self,data):
+        enc = self.mode._cipher.enc
+        C = [self.head]
+        for b in self.iterblocks(data):
+            self.chain = enc(xor(b,self.chain))
+            C.append(self.chain)
+        if len(C)>1: self.head = b''
+        return b''.join(C)
+    def final(self,data):
+        return self.blocks(self.padded(data))
+
+class CBCDecryptor(Stream):
+    held = 1
+    def __init__(self,mode):
+        super().__init__(mode)
+        self.chain = None
+    def blocks(self,data):
+        dec = self.mode._cipher.dec
+        M = []
+        for c in self.iterblocks(data):
+            if self.chain is not None:
+                M.append(xor(self.chain,dec(c)))
+            self.chain = c
+        return b''.join(M)
+    def final(self,data):
+        assert len(data)%self.l==0
+        return self.pad.remove(self.blocks(data))
+
+class CTSCBCEncryptor(CBCEncryptor):
+    def __init__(self,mode):
+        super().__init__(mode)
+        self.held = self.l
+    def final(self,data):
+        l = self.l
+        n,p = divmod(len(data),l)
+        if p==0: return self.blocks(data)
+        # the (IV) head is not output when M is shorter than one block:
+        if n==0: self.head = b''
+        C = self.blocks(data[:n*l])
+        clast = self.chain
+        if n>0: C = C[:-l]
+        b = data[n*l:].ljust(l,b'\0')
+        x = xor(b,clast)
+        return C+self.mode._cipher.enc(x)+clast[:p]
+
+class CTSCBCDecryptor(CBCDecryptor):
+    # (as for CTS_CBC.dec, the input ciphertext does not start with the IV)
+    def __init__(self,mode):
+        super().__init__(mode)
+        self.held = self.l
+        self.chain = mode.IV
+    def final(self,data):
+        l = self.l
+        n,p = divmod(len(data),l)
+        if p==0: return self.blocks(data)
+        assert n>0
+        M = self.blocks(data[:(n-1)*l])
+        dec = self.mode._cipher.dec
+        cend,clast = data[(n-1)*l:n*l],data[n*l:]
+        mend = dec(cend)
+        mprev = dec(clast+mend[p:])
+        return M+xor(self.chain,mprev)+xor(clast,mend[:p])
+
+class CTRStream(Stream):
+    def __init__(self,mode):
+        super().__init__(mode)
+        self.counter = copy(mode.counter)
+        self.counter.reset()
+    def blocks(self,data):
+        enc = self.mode._cipher.enc
+        return b''.join([xor(b,enc(self.counter())) for b in self.iterblocks(data)])
+    def final(self,data):
+        return self.blocks(data)
 
 # -----------------------------------------------------------------------------
 # Electronic Code Book, default padding is pkcs7
 class ECB(Mode):
     def __init__(self,cipher,pad=pkcs7):
         super().__init__(cipher,pad)
-    # encryption mode
-    def enc(self,M):
+    # encryption mode (blocks are dispatched by chunks if an executor is given)
+    def enc(self,M,executor=None,chunksize=64):
+        if executor is not None:
+            M = b''.join(self.iterblocks(M))
+            return self.mapblocks(self._cipher.enc,M,executor,chunksize)
         C = []
         for b in self.iterblocks(M):
             C.append(self._cipher.enc(b))
         return b''.join(C)
-    # decryption mode
-    def dec(self,C):
+    # decryption mode (blocks are dispatched by chunks if an executor is given)
+    def dec(self,C,executor=None,chunksize=64):
         n,p = divmod(len(C),self.len)
         assert p==0
+        if executor is not None:
+            M = self.mapblocks(self._cipher.dec,bytes(C),executor,chunksize)
+            return self.pad.remove(M)
         P = BytesIO(C)
         M = []
         for b in range(n):
             M.append(self._cipher.dec(P.read(self.len)))
         return self.pad.remove(b''.join(M))
+    # streaming:
+    def encryptor(self):
+        return ECBEncryptor(self)
+    def decryptor(self):
+        return ECBDecryptor(self)
 
 # -----------------------------------------------------------------------------
 # Electronic Code Book with Cypher Text Stealing (nopadding)
@@ -97,20 +278,31 @@ class CBC(Mode):
     def enc(self,M):
         C = [self.IV]
         for b in self.iterblocks(M):
-            x = self.xorstr(b,C[-1])
+            x = xor(b,C[-1])
             C.append(self._cipher.enc(x))
         return b''.join(C)
-    # decryption mode
-    def dec(self,C):
+    # decryption mode (C starts with the IV). If an executor is given, blocks
+    # are deciphered and xored with previous blocks by chunks in parallel.
+    def dec(self,C,executor=None,chunksize=64):
         l = self.len
         n,p = divmod(len(C),l)
         assert p==0
-        M = []
-        while len(C)>l:
-            c = C[-l:]
-            C = C[:-l]
-            M.insert(0,self.xorstr(C[-l:],self._cipher.dec(c)))
-        return self.pad.remove(b''.join(M))
+        if executor is not None:
+            C = bytes(C)
+            M = self.mapblocks(self._cipher.dec,C[l:],executor,chunksize,C[:-l])
+            return self.pad.remove(M)
+        C = memoryview(C)
+        M = bytearray(len(C)-l)
+        Mv = memoryview(M)
+        dec = self._cipher.dec
+        for i in range(l,len(C),l):
+            xor_into(Mv[i-l:i],C[i-l:i],dec(bytes(C[i:i+l])))
+        return self.pad.remove(bytes(M))
+    # streaming:
+    def encryptor(self):
+        return CBCEncryptor(self)
+    def decryptor(self):
+        return CBCDecryptor(self)
 
 # -----------------------------------------------------------------------------
 # Cipher Block Chaining with Cipher Text Stealing (nopadding)
@@ -124,35 +316,39 @@ class CTS_CBC(Mode):
         n,p = divmod(len(M),self.len)
         C = [self.IV]
         for b in self.iterblocks(M[:n*self.len]):
-            x = self.xorstr(b,C[-1])
+            x = xor(b,C[-1])
             C.append(self._cipher.enc(x))
         if p>0:
             clast = C.pop()
-            b = self.iterblocks(M[n*self.len:]).ljust(self.len,b'\0')
-            x = self.xorstr(b,clast)
+            b = M[n*self.len:].ljust(self.len,b'\0')
+            x = xor(b,clast)
             C.append(self._cipher.enc(x))
             C.append(clast[:p])
         return b''.join(C)
-    # decryption mode
+    # decryption mode (C does not start with the IV)
     def dec(self,C):
         l = self.len
         n,p = divmod(len(C),l)
-        M = []
+        C = memoryview(self.IV+C)
+        M = bytearray(len(C)-l)
+        Mv = memoryview(M)
+        dec = self._cipher.dec
+        # last full block is stolen if C ends with a partial block:
+        j = n*l if p==0 else (n-1)*l
+        for i in range(l,j+l,l):
+            xor_into(Mv[i-l:i],C[i-l:i],dec(bytes(C[i:i+l])))
         if p>0:
-            clast = C[-p:]
-            C = C[:-p]
-            cend = C[-l:]
-            C = C[:-l]
-            mend = self._cipher.dec(cend)
-            mprev = self._cipher.dec(clast+mend[p:])
-            M.insert(0,self.xorstr(clast,mend[:p]))
-            M.insert(0,self.xorstr(C[-l:],mprev))
-        C = self.IV+C
-        while len(C)>l:
-            c = C[-l:]
-            C = C[:-l]
-            M.insert(0,self.xorstr(C[-l:],self._cipher.dec(c)))
-        return b''.join(M)
+            cend,clast = bytes(C[j+l:j+2*l]),bytes(C[j+2*l:])
+            mend = dec(cend)
+            mprev = dec(clast+mend[p:])
+            xor_into(Mv[j:j+l],C[j:j+l],mprev)
+            xor_into(Mv[j+l:],clast,mend[:p])
+        return bytes(M)
+    # streaming:
+    def encryptor(self):
+        return CTSCBCEncryptor(self)
+    def decryptor(self):
+        return CTSCBCDecryptor(self)
 
 # -----------------------------------------------------------------------------
 # Counter mode with provided iterable counter (no padding)
@@ -185,6 +381,46 @@ class DefaultCounter:
         except AttributeError:
             print("setup and reset counter is needed")
 
+    def blocks(self,i,n):
+        "returns the n counter blocks following the first i ones (after reset)."
+        m = len(self.count0)
+        c = int.from_bytes(self.count0,'big')+i
+        mask = (1<<(8*m))-1
+        return b''.join([self.nonce+((c+k)&mask).to_bytes(m,'big') for k in range(n)])
+
+# counter blocks i0, i0+1,... precomputed from any counter, for parallel CTR:
+class _CounterBlocks(object):
+    def __init__(self,K,bytesize,i0=0):
+        self.l = bytesize
+        self.K = K
+        self.i0 = i0
+
+    def blocks(self,i,n):
+        i -= self.i0
+        return self.K[i*self.l:(i+n)*self.l]
+
+def _hasblocks(counter):
+    """True if counter.blocks(i,n) is known to return the same blocks as n
+       calls to counter() after reset and i calls: DefaultCounter (unless
+       __call__ is overridden) or any counter class that defines its own
+       blocks method.
+    """
+    c = type(counter)
+    if c.__call__ is DefaultCounter.__call__:
+        return True
+    return getattr(c,'blocks',DefaultCounter.blocks) is not DefaultCounter.blocks
+
+# process pool task: the cipher and counter are sent with each task (there
+# is one task per worker), which works with all ProcessPoolExecutor versions.
+def _ctr_task(cipher,counter,i,M):
+    "CTR encryption of M with the keystream starting at counter block i."
+    l = cipher.blocksize//8
+    n = (len(M)+l-1)//l
+    K = counter.blocks(i,n)
+    enc = cipher.enc
+    S = b''.join([enc(K[j:j+l]) for j in range(0,len(K),l)])
+    return xor(M,S)
+
 class CTR(Mode):
     def __init__(self,cipher,counter=None):
         super().__init__(cipher)
@@ -194,31 +430,53 @@ class CTR(Mode):
             counter = DefaultCounter(self.len,counter)
         self.counter = counter
 
-    # encryption mode
-    def enc(self,M):
+    # encryption mode: with workers>1 (or parallel=True for all cpus), the
+    # counter space is split in contiguous ranges processed by a pool of
+    # worker processes created for this call, or by the given executor (then
+    # workers is the number of ranges and defaults to the number of cpus).
+    def enc(self,M,workers=None,parallel=False,executor=None):
+        if (parallel or executor is not None) and not workers:
+            workers = os.cpu_count() or 1
+        if executor is not None or (workers and workers>1):
+            return self._penc(M,workers,executor)
         self.counter.reset()
         self.pad.reset()
         C = []
         for b in self.iterblocks(M):
             c = self.counter()
             k = self._cipher.enc(c)
-            x = self.xorstr(b,k)
+            x = xor(b,k)
             C.append(x)
         return b''.join(C)
 
-    # decryption mode
-    def dec(self,C):
-        self.counter.reset()
-        self.pad.reset()
-        P = self.enc(C)
-        n,p = divmod(len(C),self.len)
-        if p>0:
-            assert len(P)==n+1
-            res = P[:-p]
+    def _penc(self,M,workers,executor=None):
+        l = self.len
+        n = (len(M)+l-1)//l
+        size = max(1,-(-n//workers))
+        I = range(0,n,size)
+        counter = self.counter
+        if _hasblocks(counter):
+            T = [counter]*len(I)
         else:
-            assert len(P)==n
-            res = P
-        return res
+            # only the counter blocks of its range are sent to each task:
+            counter.reset()
+            K = b''.join([counter() for _ in range(n)])
+            T = [_CounterBlocks(K[i*l:(i+size)*l],l,i) for i in I]
+        D = [M[i*l:(i+size)*l] for i in I]
+        if executor is not None:
+            return b''.join(executor.map(_ctr_task,repeat(self._cipher),T,I,D))
+        with ProcessPoolExecutor(workers) as ex:
+            return b''.join(ex.map(_ctr_task,repeat(self._cipher),T,I,D))
+
+    # decryption mode
+    def dec(self,C,workers=None,parallel=False,executor=None):
+        return self.enc(C,workers,parallel,executor)
+
+    # streaming (encryption and decryption are the same):
+    def encryptor(self):
+        return CTRStream(self)
+    def decryptor(self):
+        return CTRStream(self)
 
 # -----------------------------------------------------------------------------
 # Chain mode of Operation Core class for Digest algorithms, nopadding default
@@ -237,7 +495,5 @@ class Chain(object):
 
     # xor input byte strings (over min length):
     def xorstr(self,a,b):
-        a = bytes(a)
-        b = bytes(b)
-        return bytes([x^y for (x,y) in zip(a,b)])
+        return xor(a,b)
 
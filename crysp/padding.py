@@ -174,7 +174,7 @@ class MDpadding(blockiterator):
         countersize = self.wsize*2
         N = self.blocksize-1-countersize-needed
         if N<0: N += self.blocksize
-        pad = mb//Bits(1,1)//Bits(0,N)
+        pad = mb//Bits.const(1,1)//Bits(0,N)
         self.padflag = True
         self.bitcnt += needed
         return pad.bytes()+pack(Bits(bitlen,countersize))
@@ -206,7 +206,7 @@ class SHApadding(blockiterator):
         countersize = self.wsize*2
         N = self.blocksize-1-countersize-needed
         if N<0: N += self.blocksize
-        pad = mb//Bits(1,1)//Bits(0,N)
+        pad = mb//Bits.const(1,1)//Bits(0,N)
         self.padflag = True
         self.bitcnt += needed
         return pad.bytes()+pack(Bits(bitlen,countersize),'>L')
@@ -241,7 +241,7 @@ class Blakepadding(blockiterator):
         N = self.blocksize-2-countersize-needed
         if N<0: N += self.blocksize
         v = 1 if self.hsize in (256,512) else 0
-        pad = mb//Bits(1,1)//Bits(0,N)//Bits(v,1)
+        pad = mb//Bits.const(1,1)//Bits(0,N)//Bits.const(v,1)
         self.padflag = True
         self.bitcnt += needed
         return pad.bytes()+pack(Bits(bitlen,countersize),'>L')
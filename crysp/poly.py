@@ -4,10 +4,144 @@
 # Copyright (C) 2009-2014 Axel Tillequin (bdcht3@gmail.com)
 # published under GPLv2 license
 
+import sys
+from array import array
 from crysp.bits import *
 
-__all__ = ['struct','Bits','reverse_byte','pack','unpack','SubPoly','Poly']
+__all__ = ['struct','Bits','reverse_byte','pack','unpack','SubPoly','Poly',
+           'clmul','cldivmod','GF2Modulus']
 
+# array.array typecodes of rings Z/2**n for n in 8,16,32,64:
+_typecodes = {}
+for _t in 'BHILQ':
+    _typecodes.setdefault((1<<(array(_t).itemsize*8))-1,_t)
+
+# polynomial arithmetic engine:
+#------------------------------------------------------------------------------
+
+# coefficients lists multiplication switches from schoolbook to Karatsuba
+# when both operands have at least KARATSUBA_THRESHOLD coefficients:
+KARATSUBA_THRESHOLD = 32
+def _schoolbook(a,b):
+    res = [0]*(len(a)+len(b)-1)
+    for i,x in enumerate(a):
+        if x:
+            for j,y in enumerate(b):
+                res[i+j] += x*y
+    return res
+
+def _addl(a,b):
+    if len(a)<len(b): a,b = b,a
+    res = list(a)
+    for i,y in enumerate(b): res[i] += y
+    return res
+
+def _karatsuba(a,b):
+    "returns the coefficients list of the product of a and b (over Z)."
+    n,m = len(a),len(b)
+    if n<KARATSUBA_THRESHOLD or m<KARATSUBA_THRESHOLD:
+        return _schoolbook(a,b)
+    k = min(n,m)//2
+    a0,a1,b0,b1 = a[:k],a[k:],b[:k],b[k:]
+    z0 = _karatsuba(a0,b0)
+    z2 = _karatsuba(a1,b1)
+    z1 = _karatsuba(_addl(a0,a1),_addl(b0,b1))
+    res = [0]*(n+m-1)
+    for i,c in enumerate(z0):
+        res[i] += c
+        res[i+k] -= c
+    for i,c in enumerate(z2):
+        res[i+2*k] += c
+        res[i+k] -= c
+    for i,c in enumerate(z1):
+        res[i+k] += c
+    return res
+
+def clmul(a,b):
+    """carry-less multiplication of a and b, ie product of polynomials of
+       GF(2)[x] packed into ints (bit i is the coefficient of x^i).
+    """
+    if a.bit_length()<b.bit_length(): a,b = b,a
+    # w-bits window over b, with table of all products of a by w-bits values:
+    w = 4 if b.bit_length()<1024 else 8
+    T = [0]*(1<<w)
+    for u in range(1,1<<w):
+        h = u.bit_length()-1
+        T[u] = T[u^(1<<h)]^(a<<h)
+    m = (1<<w)-1
+    r = i = 0
+    while b:
+        r ^= T[b&m]<<i
+        b >>= w
+        i += w
+    return r
+
+def _inv2k(a,mask):
+    """returns the inverse of odd a modulo 2**k (mask=2**k-1), by Newton
+       iteration x <- x*(2-a*x) which doubles the number of correct bits.
+    """
+    assert a&1
+    x = a  # a*a = 1 mod 8 for any odd a
+    bits = 3
+    while bits<mask.bit_length():
+        x = (x*(2-a*x))&mask
+        bits <<= 1
+    return x&mask
+
+def cldivmod(a,b):
+    "returns quotient and remainder of a by b in GF(2)[x] (packed ints)."
+    if b==0: raise ZeroDivisionError
+    n = b.bit_length()
+    q = 0
+    d = a.bit_length()-n
+    while d>=0:
+        q |= 1<<d
+        a ^= b<<d
+        d = a.bit_length()-n
+    return (q,a)
+
+class GF2Modulus(object):
+    """reduction modulo a fixed polynomial m of GF(2)[x] (packed int) of degree
+       n, using the precomputed Barrett constant mu = x^(n+k)/m so that every
+       reduction of k bits costs two carry-less multiplications.
+       (For example GF2Modulus((1<<128)|0x87) for GF(2^128).)
+    """
+    def __init__(self,m,k=512):
+        self.m = m
+        self.n = n = m.bit_length()-1
+        if n<1: raise ValueError(m)
+        self.k = k = max(k,n)
+        self.mu = cldivmod(1<<(n+k),m)[0]
+
+    def _reduce(self,a):
+        # Barrett reduction of a of degree < n+k:
+        q = clmul(a>>self.n,self.mu)>>self.k
+        return a^clmul(q,self.m)
+
+    def reduce(self,a):
+        "returns a mod m."
+        n,k = self.n,self.k
+        if a.bit_length()<=n+k:
+            return self._reduce(a)
+        # Horner's rule over k-bit chunks of a, from most significant:
+        c = (a.bit_length()-n+k-1)//k
+        mask = (1<<k)-1
+        r = a>>(c*k)
+        for i in range(c-1,-1,-1):
+            r = self._reduce((r<<k)|((a>>(i*k))&mask))
+        return r
+
+    def mul(self,a,b):
+        "returns a*b mod m."
+        return self.reduce(clmul(a,b))
+
+def _gf2pack(ival):
+    return int(''.join(['1' if x else '0' for x in reversed(ival)]) or '0',2)
+
+def _gf2unpack(v,dim):
+    return [(v>>i)&1 for i in range(max(dim,v.bit_length(),1))]
+
+#------------------------------------------------------------------------------
 class SubPoly(object):
   """The SubPoly class represents an ordered sequence of elements of a ring.
 
@@ -17,7 +151,12 @@ class SubPoly(object):
       dim(Optional[int]): the dimension of the ordered sequence (Polynomial).
 
   Attributes:
-      ival (list): the internal sequence of elements
+      ival (list): the internal sequence of elements. For rings of 8, 16, 32
+                   or 64 bits, elements are stored in an array.array and the
+                   bitwise, add, sub and shift operators are computed over the
+                   whole raw buffer at once. Such an ival supports indexing,
+                   slicing, iteration and len like a list, but does not
+                   compare equal to a list (use ival.tolist() or list(ival)).
 
  """
   def __init__(self,v,size=0,dim=0):
@@ -27,19 +166,20 @@ class SubPoly(object):
           mask = -1
       if isinstance(v,SubPoly):
           mask = v.mask
-          self.ival = [x&mask for x in v.ival]
+          ival = v.ival[:]
       elif isinstance(v,int):
-          self.ival = [v&mask]
+          ival = [v&mask]
       elif isinstance(v,Bits):
-          self.ival = [v.int()&mask]
-      elif isinstance(v,(list,tuple)):
-          self.ival = [int(x)&mask for x in v]
+          ival = [v.int()&mask]
+      elif isinstance(v,(list,tuple,array)):
+          ival = [int(x)&mask for x in v]
       elif isinstance(v,bytes):
           mask = 0xff
-          self.ival = list(bytes(v))
+          ival = v
       else:
           raise TypeError
       self.mask = mask
+      self.ival = self._vec(ival)
       if dim>0: self.dim = dim
       self.__d = None
 
@@ -57,9 +197,9 @@ class SubPoly(object):
           if dim<s:
               self.ival=self.ival[:dim]
           else:
-              self.ival+=[0]*(dim-s)
+              self.ival.extend([0]*(dim-s))
       else:
-          self.ival=[0]*dim
+          self.ival=self._vec([0]*dim)
 
   @dim.deleter
   def dim(self):
@@ -68,7 +208,7 @@ class SubPoly(object):
   @property
   def size(self):
       if self.mask==-1: return 0
-      return Bits(self.mask).size
+      return self.mask.bit_length()
 
   def __len__(self):
       return self.dim
@@ -90,6 +230,49 @@ class SubPoly(object):
       else:
           return v
 
+  def _e(self,i):
+      # same as e(i) but returns interned Bits for small rings
+      # (internal use only, the result must not be modified.)
+      v = self.ival[i] if i<self.dim else 0
+      if self.size:
+          return Bits.const(v,self.size)
+      return v
+
+  def _vec(self,l):
+      # returns the storage of elements l (array.array or list):
+      t = _typecodes.get(self.mask)
+      if t is None:
+          return l if isinstance(l,list) else list(l)
+      if isinstance(l,array) and l.typecode==t:
+          return l
+      return array(t,l)
+
+  def _is_vec(self,rvalue=None):
+      # True if whole-vector operations apply with rvalue:
+      if not isinstance(self.ival,array): return False
+      if rvalue is None: return True
+      return (isinstance(rvalue.ival,array) and rvalue.mask==self.mask
+              and len(rvalue.ival)==len(self.ival))
+
+  def _raw(self):
+      # the whole buffer of elements as a python int (element i at bit i*size):
+      return int.from_bytes(self.ival.tobytes(),sys.byteorder)
+
+  def _fromraw(self,v):
+      # returns a new object with same size/dim from the raw python int v:
+      res = self.__class__.__new__(self.__class__)
+      res.mask = self.mask
+      res.ival = array(self.ival.typecode)
+      res.ival.frombytes(v.to_bytes(len(self.ival)*self.ival.itemsize,sys.byteorder))
+      res.__d = None
+      return res
+
+  def _lanes(self,v):
+      # python int with all elements of the buffer equal to v:
+      w = self.ival.itemsize*8
+      n = len(self.ival)
+      return v*(((1<<(w*n))-1)//self.mask)
+
   def __repr__(self):
       c = self.__class__
       r = self.size
@@ -97,7 +280,7 @@ class SubPoly(object):
       return '<%s instance with ring=2**%d (dim=%d)>'%(c,r,l)
 
   def __str__(self):
-      return str(self.ival)
+      return str(list(self.ival))
 
   def redim(self):
       self.dim = self.degree+1
@@ -142,15 +325,15 @@ class SubPoly(object):
   def __getitem__(self,i):
       if isinstance(i,int):
           res = self.__class__(0,self.size,max(self.dim,i))
-          res[i] = self.e(i)
+          res[i] = self._e(i)
       elif isinstance(i,slice):
           s = self.indices(i)
           if len(s)==0: return None
           res = self.__class__(0,self.size,s[-1])
-          for i in s: res[i] = self.e(i)
+          for i in s: res[i] = self._e(i)
       else:
           res = self.__class__(0,self.size,max(i))
-          for j in i: res[j] = self.e(j)
+          for j in i: res[j] = self._e(j)
       return res
 
 # setitem operator defines b[i], b[i:j] and b[list] which allow to affect new
@@ -177,14 +360,18 @@ class SubPoly(object):
 # unary bitwise operators. The result is a new object which has same length.
 #------------------------------------------------------------------------------
   def __lshift__(self,n):
+      if self._is_vec():
+          return Poly(self._fromraw((self._raw()<<n)&self._lanes((self.mask<<n)&self.mask)))
       res = Poly(self)
       for j in range(self.dim):
-          res[j] = self.e(j)<<n
+          res[j] = self._e(j)<<n
       return res
   def __rshift__(self,n):
+      if self._is_vec():
+          return Poly(self._fromraw((self._raw()>>n)&self._lanes(self.mask>>n)))
       res = Poly(self)
       for j in range(self.dim):
-          res[j] = self.e(j)>>n
+          res[j] = self._e(j)>>n
       return res
 
 # binary operators, rvalue and lvalue implementations.
@@ -192,53 +379,93 @@ class SubPoly(object):
 #------------------------------------------------------------------------------
   def __and__(self,rvalue):
       assert self.size==rvalue.size
+      if self._is_vec(rvalue):
+          return self._fromraw(self._raw()&rvalue._raw())
       res = self.__class__(0,size=self.size,dim=max(self.dim,rvalue.dim))
       for j in range(res.dim):
-          res[j] = self.e(j)&rvalue.e(j)
+          res[j] = self._e(j)&rvalue._e(j)
       return res
   def __or__(self,rvalue):
       assert self.size==rvalue.size
+      if self._is_vec(rvalue):
+          return self._fromraw(self._raw()|rvalue._raw())
       res = self.__class__(0,size=self.size,dim=max(self.dim,rvalue.dim))
       for j in range(self.dim):
-          res[j] = self.e(j)|rvalue.e(j)
+          res[j] = self._e(j)|rvalue._e(j)
       return res
   def __xor__(self,rvalue):
       assert self.size==rvalue.size
+      if self._is_vec(rvalue):
+          return self._fromraw(self._raw()^rvalue._raw())
       res = self.__class__(0,size=self.size,dim=max(self.dim,rvalue.dim))
       for j in range(self.dim):
-          res[j] = self.e(j)^rvalue.e(j)
+          res[j] = self._e(j)^rvalue._e(j)
       return res
   def __add__(self,rvalue):
       assert self.size==rvalue.size
+      if self._is_vec(rvalue):
+          # add all elements without carry propagation across elements:
+          a,b = self._raw(),rvalue._raw()
+          H = self._lanes(1<<(self.size-1))
+          L = self._lanes(self.mask)^H
+          return self._fromraw(((a&L)+(b&L))^((a^b)&H))
       res = self.__class__(0,size=self.size,dim=max(self.dim,rvalue.dim))
       for j in range(self.dim):
-          res[j] = self.e(j)+rvalue.e(j)
+          res[j] = self._e(j)+rvalue._e(j)
       return res
   def __sub__(self,rvalue):
       assert self.size==rvalue.size
+      if self._is_vec(rvalue):
+          # subtract all elements without borrow propagation across elements:
+          a,b = self._raw(),rvalue._raw()
+          H = self._lanes(1<<(self.size-1))
+          L = self._lanes(self.mask)^H
+          return self._fromraw(((a|H)-(b&L))^((a^b^H)&H))
       res = self.__class__(0,size=self.size,dim=max(self.dim,rvalue.dim))
       for j in range(self.dim):
-          res[j] = self.e(j)-rvalue.e(j)
+          res[j] = self._e(j)-rvalue._e(j)
       return res
   def __mul__(self,rvalue):
-      res = self.__class__(0,size=self.size,dim=self.dim+rvalue.dim)
-      for j in range(self.dim):
-          for r in range(rvalue.dim):
-              res[j+r] += self.e(j)*rvalue.e(r)
-      return res
+      dim = self.dim+rvalue.dim-1
+      if self.mask==1:
+          # GF(2)[x]: carry-less multiplication of packed coefficients
+          v = clmul(_gf2pack(self.ival),_gf2pack(rvalue.ival))
+          return self.__class__(_gf2unpack(v,dim),size=1)
+      return self.__class__(_karatsuba(list(self.ival),list(rvalue.ival)),size=self.size)
   def __divmod__(self,rvalue):
+      """exact euclidean division: over Z the leading coefficient of rvalue
+         must divide every intermediate leading coefficient, over Z/2**size
+         it must be invertible (odd) or divide them as well.
+      """
       if rvalue.is_zero(): raise ZeroDivisionError
-      q,r = 0, self.__class__(self)
-      ddeg = rvalue.degree
-      ldc = rvalue.e(ddeg)
-      mxp = r.degree - ddeg
-      while mxp >= 0:
-          mdr = self.__class__([0]*mxp + [r.e(r.degree)/ldc], size=self.size)
-          mdr.redim()
-          q += mdr
-          r -= mdr*rvalue
-          mxp = r.degree - ddeg
-      return (q,r)
+      if self.mask==1:
+          q,r = cldivmod(_gf2pack(self.ival),_gf2pack(rvalue.ival))
+          return (self.__class__(_gf2unpack(q,1),size=1),
+                  self.__class__(_gf2unpack(r,1),size=1))
+      mask = self.mask
+      b = list(rvalue.ival)
+      db = len(b)-1
+      while b[db]&mask==0: db -= 1
+      ldc = b[db]&mask
+      inv = None
+      if mask!=-1 and ldc&1: inv = _inv2k(ldc,mask)
+      a = list(self.ival)
+      q = [0]*max(len(a)-db,1)
+      for i in range(len(a)-1-db,-1,-1):
+          c = a[i+db]&mask
+          if c==0: continue
+          if inv is not None:
+              c = (c*inv)&mask
+          else:
+              c,m = divmod(c,ldc)
+              if m: raise ValueError("inexact division")
+          q[i] = c
+          for j in range(db+1):
+              a[i+j] = (a[i+j]-c*b[j])&mask
+      return (self.__class__(q,size=self.size),
+              self.__class__(a[:db] or [0],size=self.size))
+  def __mod__(self,rvalue):
+      return divmod(self,rvalue)[1]
 
   def __rand__(self,lvalue):
     return (self & lvalue)
@@ -256,7 +483,7 @@ class SubPoly(object):
 # operator // is used for concatenation:
   def __floordiv__(self,rvalue):
       res = self.__class__(0,self.size)
-      res.ival = self.ival+rvalue.ival
+      res.ival = res._vec(list(self.ival)+[x&res.mask for x in rvalue.ival])
       return res
 
   def split(self,newsize,bigend=False):
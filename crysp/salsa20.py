@@ -6,6 +6,7 @@
 
 from crysp.poly import *
 from crysp.utils.operators import *
+from crysp.utils.xor import xor
 
 rM    = [0,1,2,3,5,6,7,4,10,11,8,9,15,12,13,14]
 rMinv = [rM.index(x) for x in range(16)]
@@ -56,10 +57,7 @@ class Salsa20(object):
         for x in self.keystream(v):
             b = m[p:p+64]
             if len(b)==0: break
-            x = x.split(8)
-            x.dim = len(b)
-            c = x^Poly(b)
-            C.append(bytes(c.ival))
+            C.append(xor(b,bytes(x.split(8).ival)))
             p += 64
         return b''.join(C)
 
@@ -48,10 +48,16 @@ class SHA1(object):
             a,b,c,d,e = self.H
             assert len(W)==16
             for t in range(16,80):
-                w = rol(W[t-3]^W[t-8]^W[t-14]^W[t-16],self.version)
-                W.append(w)
+                w = W[t-3]^W[t-8]
+                w ^= W[t-14]
+                w ^= W[t-16]
+                W.append(w.rol_(self.version))
             for r in range(80):
-                T = rol(a,5)+self.ft[r](b,c,d)+e+self.K[r]+W[r]
+                T = rol(a,5)
+                T += self.ft[r](b,c,d)
+                T += e
+                T += self.K[r]
+                T += W[r]
                 e = d
                 d = c
                 c = rol(b,30)
@@ -178,11 +184,19 @@ class SHA2(SHA1): #lgtm [py/missing-call-to-init]
             assert len(W)==16
             N = 80 if self.size>256 else 64
             for t in range(16,N):
-                w = self.sigma_1(W[t-2])+W[t-7]+self.sigma_0(W[t-15])+W[t-16]
+                w = self.sigma_1(W[t-2])
+                w += W[t-7]
+                w += self.sigma_0(W[t-15])
+                w += W[t-16]
                 W.append(w)
             for r in range(N):
-                T1 = h + self.Sigma_1(e) + Ch(e,f,g) + self.K[r]+W[r]
-                T2 = self.Sigma_0(a) + Maj(a,b,c)
+                T1 = self.Sigma_1(e)
+                T1 += h
+                T1 += Ch(e,f,g)
+                T1 += self.K[r]
+                T1 += W[r]
+                T2 = self.Sigma_0(a)
+                T2 += Maj(a,b,c)
                 h = g
                 g = f
                 f = e
@@ -190,7 +204,8 @@ class SHA2(SHA1): #lgtm [py/missing-call-to-init]
                 d = c
                 c = b
                 b = a
-                a = T1 + T2
+                a = T2
+                a += T1
             self.H[0] += a
             self.H[1] += b
             self.H[2] += c
@@ -133,7 +133,7 @@ class UBI(Chain):
         if bitlen is None:
             bitlen=len(M)*8
         else:
-            M = (Bits(M,bitlen)//Bits(1,1)).bytes()
+            M = (Bits(M,bitlen)//Bits.const(1,1)).bytes()
         # get BitPad flag:
         B = 1 if bitlen%8 else 0
         # pad M' into M'':
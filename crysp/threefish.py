@@ -79,15 +79,18 @@ class Threefish(object):
         ks.append(k[(s+self.Nw-1)%p]+s)
         return ks
 
+    # MIX and MIXinv update their (fresh) input words in place:
     def __MIX(self,x0,x1,d,j):
-        y0 = x0+x1
-        y1 = rol(x1,self.__R[d%8][j])^y0
-        return [y0,y1]
+        x0 += x1
+        x1.rol_(self.__R[d%8][j])
+        x1 ^= x0
+        return [x0,x1]
 
     def __MIXinv(self,y0,y1,d,j):
-        rr = y0^y1
-        x1 = ror(rr,self.__R[d%8][j])
-        return [y0-x1,x1]
+        y1 ^= y0
+        y1.ror_(self.__R[d%8][j])
+        y0 -= y1
+        return [y0,y1]
 
     def enc(self,M):
         if isinstance(M,bytes): M=Bits(M,bitorder=1)
@@ -3,19 +3,33 @@
 # Copyright (C) 2009-2014 Axel Tillequin (bdcht3@gmail.com) 
 # published under GPLv2 license
 from functools import reduce
+from crysp.bits import Bits,BitsBuilder
 
 # rotation operators:
 #--------------------
 def rol(x,n):
+    if isinstance(x,Bits): return Bits(x).rol_(n)
     return (x<<n | x>>(x.size-n))
 def ror(x,n):
+    if isinstance(x,Bits): return Bits(x).ror_(n)
     return (x>>n | x<<(x.size-n))
 
 
 # concatenation:
 def concat(L,bigend=False):
     if len(L)==1: return L[0]
-    if bigend: L = reversed(L)
-    return reduce(lambda x,y: x//y, L)
+    if bigend: L = L[::-1]
+    if not isinstance(L[0],Bits):
+        return reduce(lambda x,y: x//y, L)
+    # small lists are concatenated directly,
+    # larger ones are accumulated by a BitsBuilder in linear time:
+    if len(L)>64:
+        return BitsBuilder(L).bits()
+    v = size = 0
+    for x in L:
+        if not isinstance(x,Bits): x = Bits(x)
+        v |= x.int()<<size
+        size += x.size
+    return Bits(v,size)
 
 __all__ = ['reduce','rol','ror','concat']
@@ -0,0 +1,49 @@
+# This code is part of crysp
+# Copyright (C) 2026 Axel Tillequin (bdcht3@gmail.com)
+# published under GPLv2 license
+
+# xor of byte buffers: whole buffers are xored at once as python ints (or as
+# numpy uint8 arrays for large buffers, when numpy is available) rather than
+# byte per byte.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# minimal length of buffers xored with numpy:
+NUMPY_THRESHOLD = 1<<16
+
+__all__ = ['xor','xor_into']
+
+def _trim(a,b):
+    n = min(len(a),len(b))
+    if len(a)>n: a = a[:n]
+    if len(b)>n: b = b[:n]
+    return n,a,b
+
+def xor(a,b):
+    "returns the bytes xor of buffers a and b (over their min length)."
+    n,a,b = _trim(a,b)
+    if numpy is not None and n>=NUMPY_THRESHOLD:
+        return numpy.bitwise_xor(numpy.frombuffer(a,'uint8'),
+                                 numpy.frombuffer(b,'uint8')).tobytes()
+    x = int.from_bytes(a,'little')^int.from_bytes(b,'little')
+    return x.to_bytes(n,'little')
+
+def xor_into(dst,a,b):
+    """writes the xor of buffers a and b (over their min length) at the start
+       of writable buffer dst (a bytearray or memoryview), and returns dst.
+       Raises ValueError if dst is shorter than the result.
+    """
+    n,a,b = _trim(a,b)
+    if len(dst)<n:
+        raise ValueError("destination buffer too short (%d<%d)"%(len(dst),n))
+    if numpy is not None and n>=NUMPY_THRESHOLD:
+        out = numpy.frombuffer(dst,'uint8')[:n]
+        numpy.bitwise_xor(numpy.frombuffer(a,'uint8'),
+                          numpy.frombuffer(b,'uint8'),out=out)
+    else:
+        x = int.from_bytes(a,'little')^int.from_bytes(b,'little')
+        dst[:n] = x.to_bytes(n,'little')
+    return dst
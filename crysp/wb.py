@@ -2,7 +2,7 @@
 # Copyright (C) 2011 Axel Tillequin (bdcht3@gmail.com) 
 # published under GPLv2 license
 
-from .bits import Bits
+from .bits import Bits,BitPermutation
 from .des import subkey,IP,IPinv,PC1,P,E,S
 from .poly import Poly
 
@@ -20,6 +20,9 @@ class WhiteDES(object):
         self.tM1 = tM1
         self.tM2 = tM2
         self.tM3 = tM3
+        # compiled byte-table plans of the M1 and M3 bit permutations:
+        self.pM1 = BitPermutation(tM1,64,method='tables')
+        self.pM3 = BitPermutation(tM3,96,method='tables')
         self.size = 64
         self.blocksize = 64
 
@@ -32,7 +35,7 @@ class WhiteDES(object):
     def enc(self,M):
         assert len(M)==8
         M = Bits(M)
-        blk = M[self.tM1]
+        blk = M[self.pM1]
         for r in range(16):
             t = 0
             for n in range(12):
@@ -40,7 +43,7 @@ class WhiteDES(object):
                 blk[t:nt] = self.KT[r][n][blk[t:nt]]
                 t = nt
             blk = self.__FX(blk)
-        return (blk[self.tM3]).bytes()
+        return (blk[self.pM3]).bytes()
 
     def dec(self,C):
         assert len(C)==8
@@ -57,12 +60,12 @@ def table_rKS(r,K):
     for n in range(8):
         rks.append([0]*64)
     for v in range(64):
-        re = Bits(v,6)
+        re = Bits.const(v,6)
         for n in range(8):
             x = re^nfk[n]
             i = x[(5,0)].ival
             j = x[(4,3,2,1)].ival
-            rks[n][re] = Bits(S(n,(i<<4)+j),4)[::-1].ival
+            rks[n][re] = S(n,(i<<4)+j)[::-1].ival
     for n in range(8):
         rks[n] = tuple(rks[n])
     return tuple(rks)
@@ -74,9 +77,9 @@ def table_rKT(r,K):
     for n in range(12):
         rkt.append(list(range(256)))
     for v in range(256):
-        re = Bits(v,8)
+        re = Bits.const(v,8)
         for n in range(8):
-            x = Bits(rks[n][re[0:6].ival],4)//re[(0,5,6,7)]
+            x = Bits.const(rks[n][re[0:6].ival],4)//re[(0,5,6,7)]
             rkt[n][re.ival] = x.ival
     for n in range(12):
         rkt[n] = tuple(rkt[n])
@@ -22,7 +22,7 @@ setup(
     install_requires=[],
     extras_require={
       'test': ['pytest'],
-      'full': ['matplotlib','grandalf'],
+      'full': ['matplotlib','grandalf','numpy'],
     },
     package_data={
     },
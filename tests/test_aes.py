@@ -22,8 +22,8 @@ def test_aes_keyschedule():
     assert E.Nb==4
     assert E.Nk==4
     assert E.Nr==10
-    E.keyschedule()
-    w = E._AES__w
+    w = E.keyschedule()
+    assert E.keyschedule() is w
     assert len(w)==E.Nb*(E.Nr+1)
     assert pack(w[4])  == b'\xa0\xfa\xfe\x17'
     assert pack(w[19]) == b'\xdb\x0b\xad\x00'
@@ -80,3 +80,55 @@ def test_aes_ctr():
     assert c12.hex() == c1.hex()+"9806f66b7970fdff8617187bb9fffdff"
     c123 = E.enc(m1+m2+m3)
     assert c123.hex() == c12.hex()+"5ae4df3edbd5d35e5b4f09020db0"
+
+@pytest.mark.parametrize('n',[16,24,32])
+def test_aes_fast(n):
+    import os
+    E = AES(os.urandom(n))
+    for _ in range(8):
+        m = os.urandom(16)
+        c = E.enc(m)
+        assert E.fast_enc(m) == c
+        assert E.fast_dec(c) == m
+
+def test_aes_fast_vectors():
+    k,m,c = (codecs.decode(s.replace(' ',''),'hex') for s in aes_vectors[0])
+    E = AES(k)
+    assert E.fast_enc(m) == c
+    assert E.fast_dec(c) == m
+
+def test_aes_keycache():
+    import crysp.aes
+    k,m,c = (codecs.decode(s.replace(' ',''),'hex') for s in aes_vectors[0])
+    crysp.aes._keycache.clear()
+    E1,E2 = AES(k),AES(k)
+    w = E1.keyschedule()
+    assert E2.keyschedule() is w
+    assert E2.fastkeys() is E1.fastkeys()
+    dw = E1.keyschedule(inverse=True)
+    assert len(dw) == len(w)
+    assert dw[0:4] == w[40:44] and dw[40:44] == w[0:4]
+    state = Poly(concat(w[36:40]))
+    E1.InvMixColumns(state)
+    assert concat(dw[4:8]) == state
+    for i in range(crysp.aes.KEYCACHE_SIZE):
+        AES(i.to_bytes(16,'little'))
+    assert len(crysp.aes._keycache) == crysp.aes.KEYCACHE_SIZE
+    assert AES(k).keyschedule() is not w
+    assert AES(k).fast_dec(c) == m
+
+def test_aes_blocks():
+    import os
+    E = AES(os.urandom(24))
+    M = os.urandom(16*20)
+    C = E.enc_blocks(M)
+    assert isinstance(C,bytearray)
+    assert bytes(C) == b''.join([E.enc(M[i:i+16]) for i in range(0,len(M),16)])
+    assert E.dec_blocks(memoryview(C)) == M
+    out = bytearray(len(M))
+    assert E.enc_blocks(bytearray(M),out) is out and out == C
+    E.dec_blocks(out,out)
+    assert out == M
+    assert E.enc_blocks(b'') == b''
+    with pytest.raises(ValueError):
+        E.enc_blocks(M[:-1])
@@ -0,0 +1,15 @@
+import pytest
+import os
+from crysp.bench import _ciphers,bench_keyagility
+
+def test_keyagility_aes_setup():
+    # setup must build the key schedule(s), not only the AES object:
+    for name,klen,blen,setup,enc in _ciphers():
+        if not name.startswith('AES'): continue
+        sched = setup(os.urandom(klen))._AES__sched
+        assert sched[0] is not None
+        assert (sched[2] is not None)==name.endswith('/fast')
+    names = ['AES-128','AES-128/fast']
+    res = bench_keyagility(nkeys=3,nblocks=5,names=names)
+    for name in names:
+        assert res[name]['first']<10*res[name]['block']
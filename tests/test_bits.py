@@ -40,3 +40,205 @@ def test_import_bytes_Honeywell316():
     y = Bits(0x0a0b0c0d,32)
     assert x==y
 
+
+def test_hw_hd():
+    x = Bits(0xf0f1,16)
+    y = Bits(0x00ff,16)
+    assert x.hw()==9
+    assert x.hd(y)==7
+    assert Bits(0x3f,5).hw()==5
+    with pytest.raises(ValueError):
+        x.hd(Bits(0,8))
+
+def test_hw_many_hd_many():
+    L = [Bits(0xf0f1,16),Bits(0,16),0x7,Bits(b'\xff\x01')]
+    assert hw_many(L)==[9,0,3,9]
+    assert hd_many(L[:2],Bits(0xff,16))==[7,8]
+    assert hd_many([1,2,3],[3,3,3])==[1,1,0]
+    with pytest.raises(ValueError):
+        hd_many(L[:2],[0])
+
+def test_import_buffers():
+    b = b'\x01\x05\x82\x10'
+    for bo in (-1,1,0,2,-2):
+        x = Bits(b,bitorder=bo)
+        assert Bits(bytearray(b),bitorder=bo) == x
+        assert Bits(memoryview(b),bitorder=bo) == x
+        assert Bits(memoryview(b)[1:],bitorder=1) == Bits(b[1:],bitorder=1)
+    x = Bits(b)
+    assert x.bytes() == b
+    assert Bits(0x41a080,size=21).bytes() == b'\x01\x05\x80'
+
+def test_bitsarray():
+    from crysp.utils.operators import rol,ror
+    L = [0x01234567,0x89abcdef,0xffffffff,0]
+    a = BitsArray(L,32)
+    b = BitsArray([Bits(x,32)<<4 for x in L],32)
+    assert len(a)==4 and a.size==32
+    assert a[1]==Bits(0x89abcdef,32)
+    assert (a^b).tolist() == [x^((x<<4)&0xffffffff) for x in L]
+    assert (a+b).tolist() == [(x+((x<<4)&0xffffffff))&0xffffffff for x in L]
+    assert (a-1)[3] == 0xffffffff
+    assert (~a).tolist() == [x^0xffffffff for x in L]
+    assert a.rol(5).tolist() == [rol(Bits(x,32),5).ival for x in L]
+    assert a.ror(13).tolist() == [ror(Bits(x,32),13).ival for x in L]
+    c = BitsArray(a)
+    c ^= a
+    assert c.tolist() == [0]*4
+    assert a.tolist() == L
+    d = BitsArray.frombytes(a.tobytes(bigend=True),32,bigend=True)
+    assert d == a
+    assert a.tobytes()[:4] == b'\x67\x45\x23\x01'
+    e = BitsArray([0x1ffff,3],28)
+    assert e.rol(20)[0] == rol(Bits(0x1ffff,28),20)
+    with pytest.raises(ValueError):
+        a^BitsArray(3,32)
+
+@pytest.mark.parametrize('size',[8,28,32,64])
+def test_bitsarray_numpy(size):
+    pytest.importorskip('numpy')
+    import random
+    L = [random.getrandbits(size) for _ in range(9)]
+    R = [random.getrandbits(size) for _ in range(9)]
+    a,b = BitsArray(L,size),BitsArray(R,size)
+    na,nb = BitsArray(L,size,np=True),BitsArray(R,size,np=True)
+    assert na.np and not a.np
+    for f in (lambda x,y: x^y, lambda x,y: x&y, lambda x,y: x|y,
+              lambda x,y: x+y, lambda x,y: x-y, lambda x,y: x+3,
+              lambda x,y: ~x, lambda x,y: x<<5, lambda x,y: x>>7,
+              lambda x,y: x.rol(3)):
+        assert f(na,nb).tolist() == f(a,b).tolist()
+
+def test_const():
+    x = Bits.const(5,4)
+    assert x is Bits.const(5,4)
+    assert x==Bits(5,4) and x.size==4
+    assert Bits.const(1,1) is Bits.const(1,1)
+    assert Bits.const(300,16) is not Bits.const(300,16)
+    assert Bits.const(300,16)==Bits(300,16)
+
+def test_const_readonly():
+    a = Bits.const(3,4)
+    a ^= 1
+    assert a==2 and Bits.const(3,4)==3
+    a = Bits.const(3,4)
+    a += 1
+    a.rol_(1)
+    assert a==8 and Bits.const(3,4)==3
+    assert Bits.const(3,4).ror_(1)==9 and Bits.const(3,4)==3
+    c = Bits.const(3,4)
+    with pytest.raises(TypeError):
+        c[0] = 0
+    with pytest.raises(AttributeError):
+        c.ival = 0
+    with pytest.raises(AttributeError):
+        c.size = 8
+    assert c==3 and c.size==4
+    import pickle
+    assert pickle.loads(pickle.dumps(c)) is c
+
+def test_inplace_aliasing():
+    a = Bits(3,4)
+    b = a
+    a ^= 1
+    assert b is a and b==2
+
+def test_bitpermutation():
+    x = Bits(0x0123456789abcdef,64)
+    t = list(range(8,64))+list(range(8))
+    p = BitPermutation(t)
+    assert p.shifts is not None
+    assert x[p] == x[t] == p(x)
+    assert p(x.ival) == x[t].ival
+    t = [(k*7)%64 for k in range(64)]+[0,0,63]
+    p = BitPermutation(t)
+    assert p.shifts is None
+    assert len(p)==67 and list(p)==t
+    assert x[p] == x[t]
+    assert x[p].size == 67
+    p = BitPermutation(range(64),method='tables')
+    assert p.shifts is None and len(p.tables)==8
+    assert x[p] == x
+    p = BitPermutation(t,method='shifts')
+    assert p.shifts is not None
+    assert x[p] == x[t]
+
+def test_inplace():
+    x = Bits(0xf0,8)
+    y = x
+    x ^= 0x0f
+    assert y is x and x.ival==0xff
+    x += 1
+    assert x.ival==0 and x.size==8
+    x -= 1
+    assert x.ival==0xff
+    x &= Bits(0x3c,8)
+    x |= Bits(0x100,12)
+    assert x.ival==0x13c and x.size==12
+    x.rol_(4)
+    assert x.ival==0x3c1
+    x.ror_(8)
+    assert x.ival==0xc13
+    z = Bits(0x80000001,32)
+    assert z.rol_(1).ival==3 and z.ror_(33).ival==0x80000001
+
+def test_bitreader():
+    from io import BytesIO
+    s = b'\x01\x05\x82\xff\x10'
+    for bo in (-1,1):
+        r = BitReader(BytesIO(s),bitorder=bo,bufsize=2)
+        x = r.read(3)//r.read(14)//r.read(7)
+        assert x == Bits(s[:3],bitorder=bo)
+        assert r.bitcnt == 24
+        assert r.read() == Bits(s[3:],bitorder=bo)
+        assert r.read(8).size == 0
+    r = BitReader(BytesIO(s))
+    L = list(r.iterbits(16))
+    assert [b.size for b in L] == [16,16,8]
+    assert L[1] == Bits(b'\x82\xff')
+
+def test_bitwriter():
+    from io import BytesIO
+    s = b'\x01\x05\x82\xff\x10'
+    for bo in (-1,1):
+        f = BytesIO()
+        x = Bits(s,bitorder=bo)
+        with BitWriter(f,bitorder=bo,bufsize=1) as w:
+            w.write(x[0:5])
+            w.write(x[5:21].ival,16)
+            w.write(x[21:37])
+            assert f.getvalue() == s[:4]
+        assert f.getvalue() == s
+        f = BytesIO()
+        w = BitWriter(f,bitorder=bo)
+        w.write(x[0:13])
+        assert f.getvalue() == b''
+        assert w.close() == 3
+        y = Bits(x[0:13].ival,16)
+        assert f.getvalue() == (y.bytes() if bo<0 else pack(y))
+
+def test_bitsbuilder():
+    from crysp.utils.operators import concat
+    L = [Bits(x,7) for x in range(100)]+[Bits(b'\x01\x02'),3]
+    x = BitsBuilder(L[:50],bufsize=2)
+    for b in L[50:]: x //= b
+    y = L[0]
+    for b in L[1:]: y = y//b
+    assert len(x)==y.size
+    assert x.bits() == y
+    assert concat(L) == y
+    assert concat(L[:10],bigend=True) == concat(L[9::-1])
+    assert concat(L).size == y.size
+
+def test_render():
+    x = Bits(b'\x01\x05\x82')
+    assert str(x) == '000000010000010110000010'
+    assert str(Bits(0x6,5)) == '01100'
+    assert str(Bits(0,0)) == ''
+    assert Bits(0x6,5).todots() == '| ..  |'
+    assert Bits.from_str('01100') == Bits(0x6,5)
+    assert Bits.from_str('| ..  |') == Bits(0x6,5)
+    assert Bits.from_str(str(x)) == x
+    assert Bits.from_hex(x.hex()) == x
+    assert Bits.from_hex('010582') == x
+    assert Bits.from_hex(b'0105',13).size == 13
@@ -0,0 +1,48 @@
+import pytest
+import codecs
+from crysp.bitslice import *
+from crysp.serpent import Serpent
+from crysp.des import DES
+from crysp.mode import ECB,CTR
+
+def test_transpose():
+    blocks = [0x1234,0xffff,0,0x8001,0x5a5a]
+    P = transpose(blocks,16)
+    assert len(P)==16
+    assert P[0] == 0b01010
+    assert P[15] == 0b01010
+    assert untranspose(P,5) == blocks
+    assert split(join(P,5),5,16) == P
+
+def test_circuit():
+    T = [3,8,15,1,10,6,5,11,14,13,4,2,7,0,9,12]
+    S = Circuit(T,4,4)
+    X = transpose(list(range(16)),4)
+    assert untranspose(S(X,0xffff),16) == T
+
+def test_bitsliced_serpent():
+    K = codecs.decode("8000000000000000000000000000000000000000000000000000000000000000",'hex')
+    P = bytes(16)+b'0123456789abcdef'+bytes(range(16))
+    S,B = Serpent(K),BitslicedSerpent(K)
+    C = B.enc(P)
+    assert C[:16]==codecs.decode("A223AA1288463C0E2BE38EBD825616C0",'hex')
+    assert C == b''.join([S.enc(P[i:i+16]) for i in range(0,48,16)])
+    assert B.dec(C)==P
+
+def test_bitsliced_des():
+    K = codecs.decode(b"0123456789ABCDEF",'hex')
+    P = b"Now is the time for all "
+    D,B = DES(K),BitslicedDES(K)
+    C = B.enc(P)
+    assert C == b''.join([D.enc(P[i:i+8]) for i in range(0,24,8)])
+    assert B.dec(C)==P
+
+def test_batch_modes():
+    K = b'k'*8
+    M = b'bitsliced batch modes of operation'
+    D,B = DES(K),BitslicedDES(K)
+    assert ecb_enc(B,M) == ECB(D).enc(M)
+    assert ecb_dec(B,ecb_enc(B,M)) == M
+    iv = b'noncectr'
+    assert ctr(B,M,iv) == CTR(D,iv).enc(M)
+    assert ctr(B,ctr(B,M,iv),iv) == M
@@ -26,3 +26,37 @@ def test_3des():
     assert E.enc(b"CBC 3DES testing")[8:]==c
 
 
+
+def test_des_subkeys():
+    E = DES(b'12345678')
+    assert len(E.subkeys)==16
+    assert E.dec(E.enc(b"Now is t"))==b"Now is t"
+    T = TDEA(b'12345678')
+    assert T.E1 is T.E2 is T.E3
+    assert T.enc(b"Now is t")==E.enc(b"Now is t")
+    T = TDEA(b'12345678abcdabcd')
+    assert T.E1 is T.E3 and T.E2 is not T.E1
+    T = TDEA(b'12345678abcdabcdABCDEFGH')
+    assert T.E3.K==Bits(b'ABCDEFGH',64)
+    assert T.dec(T.enc(b"Now is t"))==b"Now is t"
+
+def test_des_F():
+    from crysp.des import F,_F,PC1
+    E = DES(b'12345678')
+    R = Bits(0x89abcdef,32)
+    k = PC1(E.K)
+    for r in (0,7,15):
+        assert F(R,k,r)==_F(R,E.subkeys[r])
+
+@pytest.mark.parametrize('k,m,c',[
+  ("0123456789ABCDEF","4e6f772069732074","3fa40e8a984d4815"),
+  ("133457799BBCDFF1","0123456789ABCDEF","85e813540f0ab405"),
+])
+def test_des_fast(k,m,c):
+    E = DES(bytes.fromhex(k))
+    m,c = bytes.fromhex(m),bytes.fromhex(c)
+    assert E.enc(m)==E.fast_enc(m)==c
+    assert E.dec(c)==E.fast_dec(c)==m
+    T = TDEA(b'12345678abcdabcdABCDEFGH')
+    assert T.fast_enc(m)==T.enc(m)
+    assert T.fast_dec(T.fast_enc(m))==m
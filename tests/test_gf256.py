@@ -0,0 +1,18 @@
+import pytest
+from crysp.gf256 import *
+
+def test_gf256_tables():
+    assert gmul(0x57,0x83) == 0xc1
+    for n in (2,3,9,11,13,14,0x83):
+        t = table(n)
+        assert len(t) == 256
+        assert all(t[a] == (gmul(a,n) if a else 0) for a in range(256))
+    assert M2[0x57] == 0xae and M3[0x57] == 0xf9
+    assert table(0) == bytes(256)
+    assert table(1) == bytes(range(256))
+
+def test_gf256_mul():
+    b = bytes(range(256))
+    assert mul(b,2) == M2
+    assert mul(bytearray(b'\x57\x00'),0x13) == bytearray(b'\xfe\x00')
+    assert mul(memoryview(b'\x57'),0x08) == b'\x8e'
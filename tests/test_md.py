@@ -50,3 +50,12 @@ def test_md6_003():
     h = b"4e78ab5ec8926a3db0dcfa09ed48de6c33a7399e70f01ebfc02abb52767594e2"
     assert md6(m) == codecs.decode(h,'hex')
 
+
+@pytest.mark.parametrize('H',[MD4,MD5])
+def test_md_state(H):
+    h1,h2 = H()(b'abc'),H()(b'a'*200)
+    x,y = H(),H()
+    assert x(b'abc')==h1 and x(b'a'*200)==h2 and x(b'abc')==h1
+    z = H()
+    z.update(b'a'*128)
+    assert y(b'abc')==h1 and H()(b'a'*200)==h2
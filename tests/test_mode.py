@@ -0,0 +1,81 @@
+import pytest
+import os
+from crysp.aes import AES
+from crysp.mode import ECB,CBC,CTS_CBC,CTR,DefaultCounter
+
+K  = b'0123456789abcdef'
+IV = b'fedcba9876543210'
+
+# chunk sizes around the 16-byte block boundaries (cycled over the input):
+CHUNKS = (0,1,15,16,17,0,3,32,5)
+
+def stream(ctx,x):
+    res = []
+    i = k = 0
+    while i<len(x):
+        j = i+CHUNKS[k%len(CHUNKS)]
+        res.append(ctx.update(x[i:j]))
+        i = j
+        k += 1
+    res.append(ctx.finalize())
+    return b''.join(res)
+
+@pytest.mark.parametrize('n',[1,15,16,17,32,33,50])
+def test_mode_stream(n):
+    A = AES(K)
+    M = os.urandom(n)
+    for mode in (lambda: ECB(A), lambda: CBC(A,IV), lambda: CTR(A,IV)):
+        C = mode().enc(M)
+        assert stream(mode().encryptor(),M)==C
+        assert stream(mode().decryptor(),C)==M
+    if n>16:
+        C = CTS_CBC(A,IV).enc(M)
+        assert stream(CTS_CBC(A,IV).encryptor(),M)==C
+        assert stream(CTS_CBC(A,IV).decryptor(),C[16:])==M
+        assert CTS_CBC(A,IV).dec(C[16:])==M
+    C = CBC(A,IV).enc(M)
+    assert CBC(A,IV).dec(bytearray(C))==M
+
+def test_mode_stream_finalized():
+    E = CBC(AES(K),IV).encryptor()
+    assert E.update(b'abc')==b''
+    assert len(E.update(b'x'*16))==32
+    assert len(E.finalize())==16
+    with pytest.raises(ValueError):
+        E.update(b'abc')
+
+class Counter(object):
+    def reset(self):
+        self.i = 0
+    def __call__(self):
+        self.i += 7
+        return self.i.to_bytes(16,'little')
+
+class OddCounter(DefaultCounter):
+    def __call__(self):
+        self.count += 2
+        return super().__call__()
+
+def test_ctr_parallel():
+    A = AES(K)
+    M = os.urandom(16*5+3)
+    for c in (IV,Counter(),OddCounter(16,IV)):
+        C = CTR(A,c).enc(M)
+        assert CTR(A,c).enc(M,workers=2)==C
+        assert CTR(A,c).dec(C,workers=3)==M
+        assert CTR(A,c).dec(C)==M
+
+def test_mode_executor():
+    from concurrent.futures import ThreadPoolExecutor,ProcessPoolExecutor
+    A = AES(K)
+    M = os.urandom(16*7+3)
+    E,D,T = ECB(A).enc(M),CBC(A,IV).enc(M),CTR(A,IV).enc(M)
+    for ex in (ThreadPoolExecutor(3),ProcessPoolExecutor(2)):
+        with ex:
+            for w in (None,2,5):
+                assert CTR(A,IV).enc(M,workers=w,executor=ex)==T
+                assert CTR(A,Counter()).dec(CTR(A,Counter()).enc(M),3,executor=ex)==M
+            for n in (1,3,64):
+                assert ECB(A).enc(M,executor=ex,chunksize=n)==E
+                assert ECB(A).dec(E,executor=ex,chunksize=n)==M
+                assert CBC(A,IV).dec(D,executor=ex,chunksize=n)==M
@@ -7,10 +7,75 @@ def test_Poly_001():
     assert x.dim==3
     assert x.e(0).size==64
     for v in x: assert v==Bits(0,64)
-    assert x.ival == [0,0,0]
+    assert x.ival.tolist() == [0,0,0]
     x[0] = 1
     x[1:3] = 2,Bits(4,64)
     y = x.split(32)
     assert y.dim == 6
     y[2,4,1] = 0,0,1
     assert y.ival[0] == 1
+
+def test_Poly_vector():
+    import random
+    for size in (8,16,32,64):
+        m = (1<<size)-1
+        a = [random.getrandbits(size) for _ in range(16)]
+        b = [random.getrandbits(size) for _ in range(16)]
+        x,y = Poly(a,size),Poly(b,size)
+        assert x.ival.itemsize*8 == size
+        assert (x^y).ival.tolist() == [u^v for u,v in zip(a,b)]
+        assert (x&y).ival.tolist() == [u&v for u,v in zip(a,b)]
+        assert (x|y).ival.tolist() == [u|v for u,v in zip(a,b)]
+        assert (x+y).ival.tolist() == [(u+v)&m for u,v in zip(a,b)]
+        assert (x-y).ival.tolist() == [(u-v)&m for u,v in zip(a,b)]
+        assert (x<<3).ival.tolist() == [(u<<3)&m for u in a]
+        assert (x>>5).ival.tolist() == [u>>5 for u in a]
+        assert (x//y).ival.tolist() == a+b
+    z = Poly([1,2,3],12)
+    assert isinstance(z.ival,list)
+    assert (z+z).ival == [2,4,6]
+
+def test_Poly_mul_divmod():
+    import random
+    import crysp.poly
+    a = [random.randint(-99,99) for _ in range(80)]
+    b = [random.randint(-99,99) for _ in range(70)]
+    assert crysp.poly._karatsuba(a,b) == crysp.poly._schoolbook(a,b)
+    for size in (0,8,64):
+        x = Poly([random.getrandbits(8) for _ in range(40)],size)
+        y = Poly([random.getrandbits(8) for _ in range(35)]+[1],size)
+        q,r = divmod(x*y,y)
+        assert q == x and r.is_zero()
+    for k in (1,8,32,64):
+        m = (1<<k)-1
+        for v in (1,3,0xff,m):
+            assert (v*crysp.poly._inv2k(v,m))&m == 1
+    x = Poly([5,7,9],8)
+    q,r = divmod(x*Poly([3,0,7],8),Poly([3,0,7],8))
+    assert q == x and r.is_zero()
+    q,r = divmod(Poly([2,4,6]),Poly([2,2]))
+    assert q.ival == [-1,3] and r.ival == [4]
+    with pytest.raises(ValueError):
+        divmod(Poly([1,0,3]),Poly([0,2]))
+    x = Poly([1,0,1,1],1)
+    assert (x*Poly([1,1],1)).ival == [1,1,1,0,1]
+    assert (x*Poly([1,1],1)) % Poly([1,1],1) == Poly(0,1)
+
+def test_clmul():
+    import random
+    a,b = random.getrandbits(3000),random.getrandbits(2500)
+    r = 0
+    for i in range(b.bit_length()):
+        if (b>>i)&1: r ^= a<<i
+    assert clmul(a,b) == clmul(b,a) == r
+    q,r = cldivmod(a,b)
+    assert clmul(q,b)^r == a and r.bit_length()<b.bit_length()
+    M = GF2Modulus((1<<128)|0x87)
+    for x in (0,1,a,random.getrandbits(256)):
+        assert M.reduce(x) == cldivmod(x,M.m)[1]
+    x,y = random.getrandbits(128),random.getrandbits(128)
+    assert M.mul(x,y) == cldivmod(clmul(x,y),M.m)[1]
+
+def test_Poly_str():
+    assert str(Poly([1,2,3],8)) == '[1, 2, 3]'
+    assert str(Poly([1,2,3])) == '[1, 2, 3]'
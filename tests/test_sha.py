@@ -70,3 +70,14 @@ def test_sha3_001(m,h):
     sha3 = SHA3(512)
     assert sha3(m) == codecs.decode(h,'hex')
 
+
+@pytest.mark.parametrize('H',[lambda: SHA1(), lambda: SHA2(256), lambda: SHA2(512)])
+def test_sha_state(H):
+    # in-place updates of the chaining words must not leak between digests
+    # or between instances built from the same IV constants:
+    h1,h2 = H()(b'abc'),H()(b'a'*200)
+    x,y = H(),H()
+    assert x(b'abc')==h1 and x(b'a'*200)==h2 and x(b'abc')==h1
+    z = H()
+    z.update(b'a'*256)
+    assert y(b'abc')==h1 and H()(b'a'*200)==h2
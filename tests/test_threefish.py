@@ -54,3 +54,14 @@ def test_threefish(v):
     assert F.enc(m)==c
     assert F.dec(c)==m
 
+
+def test_threefish_inputs():
+    # MIX updates words in place, inputs must be left unchanged:
+    k,t,m,c = (codecs.decode(s,'hex') for s in vectors[1])
+    F = Threefish(k,t)
+    M = Bits(m,bitorder=1)
+    assert F.enc(M)==c and F.enc(M)==c
+    assert M==Bits(m,bitorder=1)
+    C = Bits(c,bitorder=1)
+    assert F.dec(C)==m and F.dec(C)==m
+    assert C==Bits(c,bitorder=1)
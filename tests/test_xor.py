@@ -0,0 +1,34 @@
+import pytest
+import os
+from crysp.utils.xor import xor,xor_into
+
+@pytest.mark.parametrize('n',[0,1,16,17,1000])
+def test_xor(n):
+    a,b = os.urandom(n),os.urandom(n+3)
+    r = bytes([x^y for (x,y) in zip(a,b)])
+    assert xor(a,b)==xor(b,a)==r
+    assert xor(bytearray(a),memoryview(b))==r
+    d = bytearray(n+2)
+    assert xor_into(d,a,b) is d
+    assert d==r+b'\0\0'
+    m = memoryview(d)
+    xor_into(m[1:],a,a)
+    assert d[1:]==bytes(n+1)
+
+def test_xor_into_short():
+    import crysp.utils.xor
+    for n in (8,crysp.utils.xor.NUMPY_THRESHOLD):
+        d = bytearray(n-1)
+        with pytest.raises(ValueError):
+            xor_into(d,bytes(n),bytes(n))
+        assert len(d)==n-1
+        with pytest.raises(ValueError):
+            xor_into(memoryview(d),bytes(n),bytes(n))
+
+def test_xor_large():
+    n = 1<<17
+    a,b = os.urandom(n),os.urandom(n+1)
+    r = (int.from_bytes(a,'little')^int.from_bytes(b[:n],'little')).to_bytes(n,'little')
+    assert xor(a,b)==r
+    d = bytearray(n)
+    assert xor_into(d,a,b)==r